@@ -1,10 +1,20 @@
 import networkx as nx
 import pickle
+import hashlib
+import mmap
+import struct
+from array import array
 import os
-import json
+import sys
+import tempfile
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
 # Define the main categories as initial nodes
 CATEGORIES = [
     "Knowledge",
@@ -27,11 +37,127 @@ TRAINING_CATEGORY_MAP = {
     "Automatic questions to extend known knowledge": "AutomaticQuestions"
 }
 
+# Reverse of TRAINING_CATEGORY_MAP: knowledge graph category -> training categories feeding it
+TRAINING_CATEGORIES_BY_KG_CATEGORY: Dict[str, List[str]] = {}
+for _training_category, _kg_category in TRAINING_CATEGORY_MAP.items():
+    TRAINING_CATEGORIES_BY_KG_CATEGORY.setdefault(_kg_category, []).append(_training_category)
+
+# Training subnode ids, built and interned once so bulk ingest reuses the exact key objects
+# already stored in the graph's dicts instead of formatting a fresh string per entry
+TRAINING_SUBNODE_IDS = {
+    kg_category: sys.intern(f"Training_{kg_category}") for kg_category in TRAINING_CATEGORIES_BY_KG_CATEGORY
+}
+
 # Define the default path for storing the knowledge graph in the analysis folder
 DEFAULT_GRAPH_PATH = os.path.join(
     os.path.dirname(__file__), "knowledge_graph.pkl"
 )
 
+# Graph-level attribute recording how many training records have been ingested
+SYNCED_ENTRIES_KEY = "training_synced_entries"
+
+# Translation table used to make timestamps safe inside training node ids
+_TS_TRANS = str.maketrans({":": "_", ".": "_"})
+
+def _format_multiple_choice(answer: Any) -> str:
+    return ", ".join(answer) if isinstance(answer, (list, tuple)) else str(answer)
+
+# Answer formatter per answer_type; any other type is stored as str(answer)
+_ANSWER_FORMATTERS = {
+    "multiple_choice": _format_multiple_choice
+}
+
+# Pickle protocol 5 avoids per-object framing overhead on the nested attribute dicts
+PICKLE_PROTOCOL = 5
+
+# Write buffer used when pickling so large graphs are flushed in a few big writes
+SAVE_BUFFER_SIZE = 1 << 20
+
+# Binary sidecar written next to pickles: header, node id table, msgpack attribute columns, edge index arrays
+SIDECAR_SUFFIX = ".kgbin"
+SIDECAR_MAGIC = b"KGB3"
+# magic, inode/mtime_ns/size of the pickle written in the same save, node count, edge count,
+# byte length of the msgpack attribute blob
+SIDECAR_HEADER = struct.Struct("<4sQQQIII")
+
+def _file_stamp(st: os.stat_result):
+    """Identify one written version of a file; os.replace keeps all three fields"""
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+def _write_replace(path: str, write) -> os.stat_result:
+    """
+    Write a file through write(f) into a uniquely named temporary file next to path and rename it
+    over path, so readers never see a partial file and concurrent saves never share a temporary.
+    Returns the stat of the written file.
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=name + ".", suffix=".tmp")
+    try:
+        with open(fd, "wb", buffering=SAVE_BUFFER_SIZE) as f:
+            write(f)
+        os.chmod(tmp_path, 0o644)
+        st = os.stat(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return st
+
+def question_key(question: str) -> str:
+    """
+    Return a 64-bit hex digest of the full question, used to build Q&A node ids.
+    Always blake2b, so a graph saved in one environment gets the same ids when synced in another.
+    """
+    return hashlib.blake2b(question.encode("utf-8"), digest_size=8).hexdigest()
+
+def _encode_attr_columns(rows: List[Dict[str, Any]]) -> list:
+    """
+    Turn a list of attribute dicts into dictionary-encoded columns: per key, the distinct
+    msgpack-encoded values and an int32 code per row (-1 where the row lacks the key).
+    Repetitive values such as node types and colours are stored once per column.
+    """
+    columns = {}
+    n_rows = len(rows)
+    for i, row in enumerate(rows):
+        for key, value in row.items():
+            column = columns.get(key)
+            if column is None:
+                column = columns[key] = ({}, array("i", [-1]) * n_rows)
+            uniques, codes = column
+            packed = msgpack.packb(value, use_bin_type=True, default=str)
+            code = uniques.get(packed)
+            if code is None:
+                code = uniques[packed] = len(uniques)
+            codes[i] = code
+    
+    encoded = []
+    for key, (uniques, codes) in columns.items():
+        if sys.byteorder != "little":
+            codes.byteswap()
+        encoded.append([key, list(uniques), codes.tobytes()])
+    return encoded
+
+def _decode_attr_columns(columns: list, n_rows: int) -> List[Dict[str, Any]]:
+    """
+    Rebuild the attribute dicts from columns written by _encode_attr_columns.
+    """
+    rows = [{} for _ in range(n_rows)]
+    for key, packed_values, code_bytes in columns:
+        values = [msgpack.unpackb(packed, raw=False) for packed in packed_values]
+        # Immutable values are shared between rows; lists and dicts are decoded per row
+        shared = [not isinstance(value, (list, dict)) for value in values]
+        codes = array("i")
+        codes.frombytes(code_bytes)
+        if sys.byteorder != "little":
+            codes.byteswap()
+        for row, code in zip(rows, codes):
+            if code >= 0:
+                row[key] = values[code] if shared[code] else msgpack.unpackb(packed_values[code], raw=False)
+    return rows
+
 class KnowledgeGraph:
     def __init__(self):
         self.graph = nx.DiGraph()
@@ -44,98 +170,160 @@ class KnowledgeGraph:
         # Main Documents node (for extracted knowledge) - keep same blue color in frontend
         self.graph.add_node("Documents", type="document_main")
         
-        # Add training category subnodes
-        for training_category, kg_category in TRAINING_CATEGORY_MAP.items():
-            training_subnode = f"Training_{kg_category}"
-            self.graph.add_node(training_subnode, type="training_category", training_category=training_category)
+        # Add one training subnode per knowledge graph category (several training categories can share one)
+        for kg_category, training_categories in TRAINING_CATEGORIES_BY_KG_CATEGORY.items():
+            training_subnode = TRAINING_SUBNODE_IDS[kg_category]
+            self.graph.add_node(
+                training_subnode,
+                type="training_category",
+                training_category=", ".join(training_categories),
+                training_categories=training_categories
+            )
             self.graph.add_edge("Training", training_subnode)
 
+        # Secondary index of training_qa node ids so lookups don't scan the whole graph
+        # (a dict keeps insertion order, matching the order the old full scan produced)
+        self._training_qa_nodes: Dict[str, None] = {}
+
+    def _rebuild_indexes(self):
+        """
+        Rebuild secondary indexes after the underlying graph has been replaced.
+        """
+        self._training_qa_nodes = {
+            node: None for node, node_type in self.graph.nodes(data="type") if node_type == "training_qa"
+        }
+
     def add_entry(self, category: str, question: str, answer: str, extra: Optional[dict] = None):
         """
         Add a Q&A node under a category. Optionally, add extra attributes.
         """
+        node_id, attrs, edge = self.build_entry(category, question, answer, extra)
+        self.graph.add_node(node_id, **attrs)
+        self.graph.add_edge(*edge)
+        return node_id  # Return the node identifier so callers can link elsewhere
+    
+    def build_entry(self, category: str, question: str, answer: str, extra: Optional[dict] = None):
+        """
+        Build the node and category edge for a Q&A entry without touching the graph,
+        so callers can add many entries with add_nodes_from/add_edges_from.
+        Returns (node_id, attrs, edge); raises ValueError for an unknown category.
+        """
         if category not in CATEGORIES:
             raise ValueError(f"Unknown category: {category}")
-        node_id = f"{category}:{question[:30]}"
-        self.graph.add_node(node_id, question=question, answer=answer, **(extra or {}), type="qa")
-        self.graph.add_edge(category, node_id)
-        return node_id  # Return the node identifier so callers can link elsewhere
+        # Hash the whole question so questions sharing a long prefix don't overwrite each other
+        node_id = f"{category}:{question_key(question)}"
+        attrs = {"question": question, "answer": answer, **(extra or {}), "type": "qa"}
+        return node_id, attrs, (category, node_id)
     
-    def add_training_entry(self, training_category: str, question_id: str, question: str, answer: Any, answer_type: str, timestamp: str):
+    def build_training_entry(self, training_category: str, question_id: str, question: str, answer: Any, answer_type: str, timestamp: str):
         """
-        Add a training Q&A entry to the knowledge graph.
-        Maps training categories to knowledge graph categories and connects to training subnodes.
+        Build the node and edge for a training Q&A entry without touching the graph.
+        Returns (node_id, attrs, edge) or None if the training category is unknown.
         """
         # Map training category to knowledge graph category
         kg_category = TRAINING_CATEGORY_MAP.get(training_category)
         if not kg_category:
             print(f"Warning: Unknown training category: {training_category}")
-            return
+            return None
         
         # Create a unique node ID based on question ID and timestamp
-        node_id = f"training_{question_id}_{timestamp.replace(':', '_').replace('.', '_')}"
+        node_id = f"training_{question_id}_{timestamp.translate(_TS_TRANS)}"
         
         # Format answer based on type
-        if answer_type == "multiple_choice" and isinstance(answer, list):
-            formatted_answer = ", ".join(answer)
-        else:
-            formatted_answer = str(answer)
-        
-        # Add the training node
-        self.graph.add_node(
-            node_id,
-            question=question,
-            answer=formatted_answer,
-            question_id=question_id,
-            training_category=training_category,
-            answer_type=answer_type,
-            timestamp=timestamp,
-            type="training_qa"
-        )
+        formatted_answer = _ANSWER_FORMATTERS.get(answer_type, str)(answer)
+        
+        # These values repeat across many nodes (and question ids come from a fixed question bank),
+        # so intern them to keep one shared string object per distinct value
+        attrs = {
+            "question": question,
+            "answer": formatted_answer,
+            "question_id": sys.intern(question_id),
+            "training_category": sys.intern(training_category),
+            "answer_type": sys.intern(answer_type),
+            "timestamp": timestamp,
+            "type": "training_qa"
+        }
         
         # Connect to the appropriate training category subnode
-        training_subnode = f"Training_{kg_category}"
-        self.graph.add_edge(training_subnode, node_id)
+        return node_id, attrs, (TRAINING_SUBNODE_IDS[kg_category], node_id)
     
-    def sync_with_training_data(self, training_data_path: str = "training_data.json"):
+    def add_training_entry(self, training_category: str, question_id: str, question: str, answer: Any, answer_type: str, timestamp: str):
         """
-        Synchronize the knowledge graph with training data from JSON file.
+        Add a training Q&A entry to the knowledge graph.
+        Maps training categories to knowledge graph categories and connects to training subnodes.
         """
-        if not os.path.exists(training_data_path):
-            print(f"Training data file not found: {training_data_path}")
+        built = self.build_training_entry(training_category, question_id, question, answer, answer_type, timestamp)
+        if built is None:
             return
+        node_id, attrs, edge = built
+        self.graph.add_node(node_id, **attrs)
+        self._training_qa_nodes[node_id] = None
+        self.graph.add_edge(*edge)
+    
+    def _build_training_entries(self, training_data, skip: int = 0):
+        """
+        Build nodes/edges for every training record after the first `skip`.
+        Returns (nodes, edges, total_record_count).
+        """
+        nodes = []
+        edges = []
+        entry_count = 0
+        for entry in training_data:
+            entry_count += 1
+            if entry_count <= skip:
+                continue
+            built = self.build_training_entry(
+                training_category=entry.get('category', ''),
+                question_id=entry.get('question_id', ''),
+                question=entry.get('question', ''),
+                answer=entry.get('answer', ''),
+                answer_type=entry.get('answer_type', ''),
+                timestamp=entry.get('timestamp', '')
+            )
+            if built is None:
+                continue
+            node_id, attrs, edge = built
+            nodes.append((node_id, attrs))
+            edges.append(edge)
+        return nodes, edges, entry_count
+    
+    def _apply_training_entries(self, nodes, edges, entry_count: int, synced: int):
+        """Add freshly built training nodes/edges, clearing the old ones first on a full rebuild (synced == 0)"""
+        if synced == 0:
+            # Full rebuild: remove existing training nodes to avoid duplicates
+            self.graph.remove_nodes_from(self._training_qa_nodes)
+            self._training_qa_nodes.clear()
         
-        try:
-            with open(training_data_path, 'r') as f:
-                training_data = json.load(f)
-            
-            # Remove existing training nodes to avoid duplicates
-            nodes_to_remove = [node for node, data in self.graph.nodes(data=True) 
-                             if data.get('type') == 'training_qa']
-            self.graph.remove_nodes_from(nodes_to_remove)
-            
-            # Add training entries
-            for entry in training_data:
-                self.add_training_entry(
-                    training_category=entry.get('category', ''),
-                    question_id=entry.get('question_id', ''),
-                    question=entry.get('question', ''),
-                    answer=entry.get('answer', ''),
-                    answer_type=entry.get('answer_type', ''),
-                    timestamp=entry.get('timestamp', '')
-                )
-            
-            print(f"Successfully synchronized {len(training_data)} training entries")
-            
-        except Exception as e:
-            print(f"Error syncing training data: {e}")
+        self.graph.add_nodes_from(nodes)
+        self.graph.add_edges_from(edges)
+        self._training_qa_nodes.update(dict.fromkeys(node_id for node_id, _ in nodes))
+        self.graph.graph[SYNCED_ENTRIES_KEY] = entry_count
+    
+    def sync_with_training_records(self, records: List[Dict[str, Any]]):
+        """
+        Synchronize the knowledge graph with an in-memory, append-only list of training records.
+        
+        The number of records already ingested is stored on the graph and only newer records
+        are added. If the list is shorter than that, it was rewritten and the training nodes
+        are rebuilt from scratch.
+        
+        Returns True if the graph was modified.
+        """
+        synced = self.graph.graph.get(SYNCED_ENTRIES_KEY, 0)
+        if len(records) == synced:
+            return False
+        if len(records) < synced:
+            synced = 0
+        nodes, edges, entry_count = self._build_training_entries(records, skip=synced)
+        self._apply_training_entries(nodes, edges, entry_count, synced)
+        print(f"Successfully synchronized {entry_count} training entries ({entry_count - synced} new)")
+        return True
     
     def get_training_summary(self) -> Dict[str, Any]:
         """
         Get a summary of training data in the knowledge graph.
         """
-        training_nodes = [node for node, data in self.graph.nodes(data=True) 
-                         if data.get('type') == 'training_qa']
+        training_nodes = self._training_qa_nodes
         
         # Group by category
         category_summary = {}
@@ -168,14 +356,119 @@ class KnowledgeGraph:
     def save(self, path: Optional[str] = None):
         if path is None:
             path = DEFAULT_GRAPH_PATH
-        with open(path, "wb") as f:
-            pickle.dump(self.graph, f)
+        st = _write_replace(path, lambda f: pickle.dump(self.graph, f, protocol=PICKLE_PROTOCOL))
+        if msgpack is not None:
+            # The sidecar records which pickle it was written with; if this step fails or another
+            # save replaces the pickle, load() sees the mismatch and ignores the sidecar
+            self._save_sidecar(path + SIDECAR_SUFFIX, _file_stamp(st))
 
     def load(self, path: Optional[str] = None):
         if path is None:
             path = DEFAULT_GRAPH_PATH
+        pickle_stamp = _file_stamp(os.stat(path))
+        # Prefer the binary sidecar when it was written together with the current pickle
+        sidecar_path = path + SIDECAR_SUFFIX
+        if msgpack is not None and os.path.exists(sidecar_path):
+            try:
+                if self._load_sidecar(sidecar_path, pickle_stamp):
+                    return
+            except Exception as e:
+                print(f"Warning: Could not read graph sidecar {sidecar_path}, falling back to pickle: {e}")
+        # Map the file and unpickle straight from the mapping instead of issuing many small reads
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            self.graph = pickle.loads(mm)
+        self._rebuild_indexes()
+
+    def _save_sidecar(self, path: str, pickle_stamp):
+        """
+        Write the graph as a binary sidecar: fixed header (including pickle_stamp, the
+        _file_stamp of the pickle it belongs to), length-prefixed UTF-8 node ids,
+        one msgpack blob with the graph attributes and columnar node/edge attributes,
+        then int32 source and target index arrays.
+        """
+        node_ids = list(self.graph.nodes)
+        node_index = {node: i for i, node in enumerate(node_ids)}
+        encoded_ids = [str(node).encode("utf-8") for node in node_ids]
+        id_lengths = array("I", map(len, encoded_ids))
+        
+        sources = array("i")
+        targets = array("i")
+        edge_attrs = []
+        for u, v, data in self.graph.edges(data=True):
+            sources.append(node_index[u])
+            targets.append(node_index[v])
+            edge_attrs.append(data)
+        
+        attrs_blob = msgpack.packb(
+            [
+                self.graph.graph,
+                _encode_attr_columns([data for _, data in self.graph.nodes(data=True)]),
+                _encode_attr_columns(edge_attrs)
+            ],
+            use_bin_type=True,
+            default=str
+        )
+        
+        if sys.byteorder != "little":
+            for arr in (id_lengths, sources, targets):
+                arr.byteswap()
+        
+        def write(f):
+            f.write(SIDECAR_HEADER.pack(SIDECAR_MAGIC, *pickle_stamp, len(node_ids), len(sources), len(attrs_blob)))
+            f.write(id_lengths.tobytes())
+            f.write(b"".join(encoded_ids))
+            f.write(attrs_blob)
+            f.write(sources.tobytes())
+            f.write(targets.tobytes())
+        _write_replace(path, write)
+
+    def _load_sidecar(self, path: str, pickle_stamp) -> bool:
+        """
+        Rebuild the graph from a sidecar written by _save_sidecar.
+        Returns False without touching the graph if the sidecar belongs to a different pickle.
+        """
         with open(path, "rb") as f:
-            self.graph = pickle.load(f)
+            data = f.read()
+        
+        magic, ino, mtime_ns, size, n_nodes, n_edges, attrs_len = SIDECAR_HEADER.unpack_from(data, 0)
+        if magic != SIDECAR_MAGIC:
+            raise ValueError(f"Not a knowledge graph sidecar: {path}")
+        if (ino, mtime_ns, size) != tuple(pickle_stamp):
+            return False
+        offset = SIDECAR_HEADER.size
+        
+        id_lengths = array("I")
+        id_lengths.frombytes(data[offset:offset + 4 * n_nodes])
+        offset += 4 * n_nodes
+        if sys.byteorder != "little":
+            id_lengths.byteswap()
+        node_ids = []
+        for length in id_lengths:
+            node_ids.append(data[offset:offset + length].decode("utf-8"))
+            offset += length
+        
+        graph_attrs, node_columns, edge_columns = msgpack.unpackb(data[offset:offset + attrs_len], raw=False)
+        node_attrs = _decode_attr_columns(node_columns, n_nodes)
+        edge_attrs = _decode_attr_columns(edge_columns, n_edges)
+        offset += attrs_len
+        
+        sources = array("i")
+        targets = array("i")
+        sources.frombytes(data[offset:offset + 4 * n_edges])
+        offset += 4 * n_edges
+        targets.frombytes(data[offset:offset + 4 * n_edges])
+        if sys.byteorder != "little":
+            sources.byteswap()
+            targets.byteswap()
+        
+        graph = nx.DiGraph(**graph_attrs)
+        graph.add_nodes_from(zip(node_ids, node_attrs))
+        graph.add_edges_from(
+            (node_ids[u], node_ids[v], attrs) for u, v, attrs in zip(sources, targets, edge_attrs)
+        )
+        self.graph = graph
+        self._rebuild_indexes()
+        return True
 
 if __name__ == "__main__":
     kg = KnowledgeGraph()
@@ -0,0 +1,99 @@
+"""
+The process-wide knowledge graph shared by main, the training routes and the document analysis routes.
+
+There is exactly one resident KnowledgeGraph per process and one lock around it. Callers hold
+knowledge_graph_lock while they read or change the graph, report changes with
+mark_knowledge_graph_changed(), and the graph is written back KG_FLUSH_DELAY_SECONDS later.
+"""
+
+import asyncio
+import logging
+from typing import Optional
+
+from analysis.graph import KnowledgeGraph
+
+logger = logging.getLogger(__name__)
+
+# Relative to the backend directory, which is the working directory of the app
+KNOWLEDGE_GRAPH_FILE = "knowledge_graph.pkl"
+
+# Changes are written back this long after the first unsaved one, so a burst of them costs one save
+KG_FLUSH_DELAY_SECONDS = 5.0
+
+# Held by every reader and writer of the graph, including while it is pickled in a worker thread
+knowledge_graph_lock = asyncio.Lock()
+
+_kg: Optional[KnowledgeGraph] = None
+_kg_dirty = False
+_kg_version = 0
+_kg_flush_task: Optional[asyncio.Task] = None
+
+def seed_example_entries(kg: KnowledgeGraph):
+    """Populate a fresh knowledge graph with the example entries from the original script"""
+    kg.add_entry("Knowledge", "What is your expertise?", "AI, coding, philosophy")
+    kg.add_entry("Feelings", "How do you feel today?", "Curious and motivated")
+    kg.add_entry("Personalities", "Which of the Big Five fits you best?", "Openness to experience")
+    kg.add_entry("ImportanceOfPeople", "Who is most important in your life?", "Family and close friends")
+    kg.add_entry("Preferences", "What is your favorite hobby?", "Reading science fiction")
+    kg.add_entry("Morals", "Is honesty always the best policy?", "Usually, but context matters")
+    kg.add_entry("AutomaticQuestions", "What would you like to learn next?", "Graph databases")
+
+def load_knowledge_graph() -> KnowledgeGraph:
+    """Load the knowledge graph from disk, creating and saving an example graph if none exists"""
+    kg = KnowledgeGraph()
+
+    # Try to load existing graph, if not found create a new one with examples
+    try:
+        kg.load(KNOWLEDGE_GRAPH_FILE)
+        logger.info("Loaded existing knowledge graph with %s nodes and %s edges", len(kg.graph.nodes), len(kg.graph.edges))
+    except Exception as e:
+        logger.info(f"No existing graph found, creating new one: {e}")
+        seed_example_entries(kg)
+        kg.save(KNOWLEDGE_GRAPH_FILE)
+        logger.info("Created and saved new knowledge graph with example data")
+    return kg
+
+async def get_knowledge_graph() -> KnowledgeGraph:
+    """Return the resident graph, loading it on first use (callers must hold knowledge_graph_lock)"""
+    global _kg
+    if _kg is None:
+        # Unpickling is blocking, so it runs in a worker thread
+        _kg = await asyncio.to_thread(load_knowledge_graph)
+    return _kg
+
+def knowledge_graph_version() -> int:
+    """Number of changes reported so far; lets callers cache data derived from the graph"""
+    return _kg_version
+
+def mark_knowledge_graph_changed():
+    """Record an in-memory change and schedule a write-back if none is pending"""
+    global _kg_dirty, _kg_version, _kg_flush_task
+    _kg_dirty = True
+    _kg_version += 1
+    if _kg_flush_task is None or _kg_flush_task.done():
+        _kg_flush_task = asyncio.create_task(_flush_knowledge_graph_later())
+
+async def _flush_knowledge_graph_later():
+    await asyncio.sleep(KG_FLUSH_DELAY_SECONDS)
+    await flush_knowledge_graph()
+
+async def flush_knowledge_graph():
+    """Write pending knowledge graph changes to disk"""
+    global _kg_dirty
+    async with knowledge_graph_lock:
+        if not _kg_dirty:
+            return
+        try:
+            # Pickling runs in a worker thread; the lock keeps the graph from changing meanwhile
+            await asyncio.to_thread(_kg.save, KNOWLEDGE_GRAPH_FILE)
+            _kg_dirty = False
+            logger.info("Saved knowledge graph with %s nodes and %s edges to %s", len(_kg.graph.nodes), len(_kg.graph.edges), KNOWLEDGE_GRAPH_FILE)
+        except Exception as e:
+            logger.error(f"Failed to save knowledge graph: {e}")
+
+async def close_knowledge_graph():
+    """Write out any changes still waiting for the delayed flush (called on shutdown)"""
+    # Flushed before cancelling, so a write-back already running in a thread is waited for, not abandoned
+    await flush_knowledge_graph()
+    if _kg_flush_task is not None and not _kg_flush_task.done():
+        _kg_flush_task.cancel()
@@ -1,6 +1,6 @@
 import networkx as nx
-import matplotlib.pyplot as plt
 import pickle
+import hashlib
 import os
 
 CATEGORY_COLORS = {
@@ -16,12 +16,55 @@ CATEGORY_COLORS = {
 # Always use the knowledge graph at Model_Myself/backend/analysis/knowledge_graph.pkl
 GRAPH_PATH = os.path.join(os.path.dirname(__file__), "knowledge_graph.pkl")
 
+# Spring layout positions are cached here, keyed by a hash of the node set
+LAYOUT_CACHE_DIR = os.path.join(os.path.dirname(__file__), "layout_cache")
+# Only this many layouts are kept; the least recently used ones are removed when a new one is cached
+LAYOUT_CACHE_MAX_ENTRIES = 4
+
+# Above this many nodes the spring layout runs with fewer iterations to cap its cost
+LARGE_GRAPH_NODES = 500
+
 def load_graph(path=GRAPH_PATH):
     with open(path, "rb") as f:
         return pickle.load(f)
 
-def visualize_graph(G):
-    pos = nx.spring_layout(G, seed=42)
+def layout_cache_key(G):
+    return hashlib.blake2b(repr(sorted(map(str, G.nodes))).encode("utf-8"), digest_size=16).hexdigest()
+
+def compute_layout(G):
+    """Return spring layout positions, reusing cached ones while the node set is unchanged"""
+    cache_path = os.path.join(LAYOUT_CACHE_DIR, f"{layout_cache_key(G)}.pkl")
+    if os.path.exists(cache_path):
+        with open(cache_path, "rb") as f:
+            pos = pickle.load(f)
+        # Mark as recently used so pruning keeps it
+        os.utime(cache_path)
+        return pos
+    
+    if len(G) > LARGE_GRAPH_NODES:
+        pos = nx.spring_layout(G, seed=42, iterations=20)
+    else:
+        pos = nx.spring_layout(G, seed=42)
+    
+    os.makedirs(LAYOUT_CACHE_DIR, exist_ok=True)
+    with open(cache_path, "wb") as f:
+        pickle.dump(pos, f, protocol=pickle.HIGHEST_PROTOCOL)
+    prune_layout_cache()
+    return pos
+
+def prune_layout_cache(max_entries=LAYOUT_CACHE_MAX_ENTRIES):
+    """Remove all but the max_entries most recently used cached layouts"""
+    with os.scandir(LAYOUT_CACHE_DIR) as entries:
+        cached = [entry for entry in entries if entry.is_file() and entry.name.endswith(".pkl")]
+    cached.sort(key=lambda entry: entry.stat().st_mtime_ns, reverse=True)
+    for entry in cached[max_entries:]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+def node_colors_and_labels(G):
+    """Return per-node colors (category nodes by name, Q&A nodes by parent category) and labels"""
     node_colors = []
     labels = {}
     for node, data in G.nodes(data=True):
@@ -29,11 +72,18 @@ def visualize_graph(G):
             node_colors.append(CATEGORY_COLORS.get(node, "grey"))
             labels[node] = node
         else:
-            # Q&A node: color by parent category
-            parents = list(G.predecessors(node))
-            parent = parents[0] if parents else None
+            # Q&A node: color by parent category (predecessors() is an iterator, so no list is built)
+            parent = next(G.predecessors(node), None)
             node_colors.append(CATEGORY_COLORS.get(parent, "grey"))
             labels[node] = data.get("question", node)
+    return node_colors, labels
+
+def visualize_graph(G):
+    # Imported here so load_graph() and the layout helpers don't pay matplotlib's startup cost
+    import matplotlib.pyplot as plt
+    
+    pos = compute_layout(G)
+    node_colors, labels = node_colors_and_labels(G)
     plt.figure(figsize=(12, 8))
     nx.draw(G, pos, with_labels=False, node_color=node_colors, node_size=1200, edge_color="#888", font_size=10)
     nx.draw_networkx_labels(G, pos, labels, font_size=9)
@@ -1,37 +1,43 @@
 from fastapi import FastAPI, HTTPException, UploadFile, File, Query, Form, Path as ApiPath
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 import logging
 import uvicorn
 from datetime import datetime
 from typing import List, Optional
 import os
-import io
-import json
-import shutil
+import hashlib
+import importlib.util
+import orjson
 from pathlib import Path
+from types import MappingProxyType, SimpleNamespace
+from collections import Counter
 import asyncio
+import aiofiles
 
 # MongoDB imports (optional)
 try:
     from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
     from bson import ObjectId
     import magic
+    # One libmagic handle for the whole process instead of a new one per from_buffer() call
+    mime_magic = magic.Magic(mime=True)
     MONGODB_AVAILABLE = True
 except ImportError:
     MONGODB_AVAILABLE = False
 
 from pydantic import BaseModel
 
-# Import knowledge graph from analysis module
-import sys
-sys.path.append(str(Path(__file__).parent))
+# Import knowledge graph from analysis module (the backend directory is on sys.path when run
+# via "python main.py" or "uvicorn main:app", so no sys.path manipulation is needed)
 from analysis.graph import KnowledgeGraph
+# Shared in-process knowledge graph (accessed as kg_store.* since the /knowledge-graph endpoint is named get_knowledge_graph)
+from analysis import store as kg_store
 
 # Import training router
-from routes.training import router as training_router
+from routes.training import router as training_router, sync_knowledge_graph
 # Import document analysis router
-from routes.document_analysis import router as document_analysis_router
+from routes.document_analysis import router as document_analysis_router, resume_pending_analyses
 
 # Configure logging
 logging.basicConfig(
@@ -56,11 +62,62 @@ database = None
 fs_bucket = None
 mongodb_connected = False
 
+# Connection state shared with the routers, which keep a reference to this object instead of
+# looking up the globals above on this module for every request
+storage_state = SimpleNamespace(mongodb_connected=False, database=None, fs_bucket=None)
+
 # Local storage fallback - always relative to this backend package
 BASE_DIR = Path(__file__).resolve().parent
 UPLOAD_DIR = (BASE_DIR / "uploads").resolve()
 METADATA_FILE = UPLOAD_DIR / "metadata.json"
 
+# In-memory copy of the local metadata file; mutations mark it dirty and are written back asynchronously
+_metadata_cache: Optional[list] = None
+_metadata_dirty = False
+_metadata_lock = asyncio.Lock()
+_background_tasks = set()
+
+# Lowercased filenames by document id for case-insensitive local search (kept out of the
+# metadata records themselves so it is never persisted or returned by the API)
+_filename_lower_index = {}
+
+# Uploads are read and written in chunks of this size instead of buffering whole files
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Maximum number of files from one /upload request stored at the same time
+UPLOAD_CONCURRENCY = 8
+
+# Number of leading bytes passed to libmagic for file type detection
+MAGIC_SNIFF_BYTES = 4096
+
+# Case-insensitive comparison for filename prefix search (strength 2 ignores case, not accents)
+FILENAME_COLLATION = MappingProxyType({"locale": "en", "strength": 2})
+
+# Characters of text content stored for search (a UTF-8 character is at most 4 bytes)
+SEARCHABLE_CONTENT_CHARS = 10000
+
+# Fields returned by /documents; searchable_content is only used by the text index, never displayed
+DOCUMENT_LIST_PROJECTION = MappingProxyType({
+    "filename": 1,
+    "content_type": 1,
+    "file_size": 1,
+    "upload_date": 1,
+    "file_type": 1,
+    "description": 1,
+    "category": 1
+})
+
+# uvicorn settings shared by "python main.py" and start_backend.py. uvicorn[standard] installs
+# uvloop (except on Windows) and httptools; a single worker process is kept because the routers
+# hold their caches in memory.
+SERVER_OPTIONS = MappingProxyType({
+    "loop": "uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+    "http": "httptools" if importlib.util.find_spec("httptools") else "h11",
+    "backlog": 4096,
+    "limit_concurrency": 512,
+    "timeout_keep_alive": 30
+})
+
 # Pydantic models for API responses
 class DocumentMetadata(BaseModel):
     id: str
@@ -75,12 +132,22 @@ class DocumentResponse(BaseModel):
     message: str
     documents: List[DocumentMetadata]
 
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson; datetimes are encoded natively, other unknown types via str()"""
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=str, option=orjson.OPT_NON_STR_KEYS)
+
 app = FastAPI(
     title="Model Myself Backend with MongoDB",
     description="Backend API for Model Myself application with MongoDB document storage",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=ORJSONResponse
 )
 
+# Serialized /knowledge-graph payload and the knowledge graph version it was built from
+app.state.kg_json_cache = None
+app.state.kg_json_version = None
+
 # Add CORS middleware to allow frontend to call backend
 app.add_middleware(
     CORSMiddleware,
@@ -102,21 +169,70 @@ def ensure_upload_dir():
         METADATA_FILE.write_text("[]")
 
 def load_local_metadata():
-    """Load metadata from local file"""
-    try:
-        with open(METADATA_FILE, 'r') as f:
-            return json.load(f)
-    except:
-        return []
+    """Return the in-memory metadata list (newest first), reading the local file on first use"""
+    global _metadata_cache
+    if _metadata_cache is None:
+        try:
+            with open(METADATA_FILE, 'rb') as f:
+                _metadata_cache = orjson.loads(f.read())
+        except:
+            _metadata_cache = []
+        # Sorted once here; uploads are inserted at the front so listings never need to re-sort
+        _metadata_cache.sort(key=lambda x: x.get("upload_date", ""), reverse=True)
+    return _metadata_cache
 
 def save_local_metadata(metadata):
-    """Save metadata to local file"""
+    """Replace the cached metadata and schedule a write-back to the local file"""
+    global _metadata_cache, _metadata_dirty
+    _metadata_cache = metadata
+    _metadata_dirty = True
     try:
-        with open(METADATA_FILE, 'w') as f:
-            json.dump(metadata, f, indent=2, default=str)
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # Not inside the server's event loop (e.g. a script): write synchronously
+        _write_metadata_file(orjson.dumps(metadata, default=str))
+        _metadata_dirty = False
+        return
+    task = loop.create_task(persist_local_metadata())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+def _write_metadata_file(data: bytes):
+    try:
+        with open(METADATA_FILE, 'wb') as f:
+            f.write(data)
     except Exception as e:
         logger.error(f"Error saving metadata: {e}")
 
+def filename_lower(doc: dict) -> str:
+    """Lowercased filename of a local document, computed once per document id"""
+    lower = _filename_lower_index.get(doc["id"])
+    if lower is None:
+        lower = _filename_lower_index[doc["id"]] = doc["filename"].lower()
+    return lower
+
+async def persist_local_metadata():
+    """Write the cached metadata to disk if it changed since the last write"""
+    global _metadata_dirty
+    async with _metadata_lock:
+        # Several mutations in a row queue several writes; only the first one has work to do
+        if not _metadata_dirty:
+            return
+        _metadata_dirty = False
+        data = orjson.dumps(_metadata_cache, default=str)
+        try:
+            async with aiofiles.open(METADATA_FILE, 'wb') as f:
+                await f.write(data)
+        except Exception as e:
+            _metadata_dirty = True
+            logger.error(f"Error saving metadata: {e}")
+
+def publish_storage_state():
+    """Mirror the MongoDB globals into storage_state for the routers"""
+    storage_state.mongodb_connected = mongodb_connected
+    storage_state.database = database
+    storage_state.fs_bucket = fs_bucket
+
 async def connect_to_mongodb():
     """Connect to MongoDB and initialize GridFS"""
     global mongodb_client, database, fs_bucket, mongodb_connected
@@ -135,14 +251,38 @@ async def connect_to_mongodb():
         logger.info(f"Successfully connected to MongoDB at {MONGODB_URL}")
         logger.info(f"Using database: {DATABASE_NAME}")
         mongodb_connected = True
+        publish_storage_state()
+        
+        await ensure_mongodb_indexes()
         return True
         
     except Exception as e:
         logger.error(f"Failed to connect to MongoDB: {str(e)}")
         logger.info("Falling back to local storage mode")
         mongodb_connected = False
+        publish_storage_state()
         return False
 
+async def ensure_mongodb_indexes():
+    """Create the indexes used by document listing and search (no-op if they already exist)"""
+    collection = database[COLLECTION_NAME]
+    try:
+        await collection.create_index([("upload_date", -1)])
+        await collection.create_index([("filename", 1)])
+        await collection.create_index(
+            [("filename", 1)],
+            collation=dict(FILENAME_COLLATION),
+            name="filename_case_insensitive"
+        )
+        await collection.create_index([("sha256", 1)])
+        await collection.create_index(
+            [("filename", "text"), ("searchable_content", "text"), ("description", "text")],
+            name="document_text_search"
+        )
+        logger.info("MongoDB indexes ensured")
+    except Exception as e:
+        logger.warning(f"Could not create MongoDB indexes: {e}")
+
 async def close_mongodb_connection():
     """Close MongoDB connection"""
     global mongodb_client, mongodb_connected
@@ -150,6 +290,7 @@ async def close_mongodb_connection():
         mongodb_client.close()
         logger.info("MongoDB connection closed")
     mongodb_connected = False
+    publish_storage_state()
 
 @app.on_event("startup")
 async def startup_event():
@@ -161,6 +302,14 @@ async def startup_event():
     
     # Ensure local storage is ready
     ensure_upload_dir()
+    load_local_metadata()
+    
+    # Load the shared knowledge graph once for reuse across requests
+    async with kg_store.knowledge_graph_lock:
+        await kg_store.get_knowledge_graph()
+    
+    # Resume analyses left pending by the previous run, now that MongoDB/local storage is ready
+    await resume_pending_analyses()
     
     if mongodb_connected:
         logger.info("✅ Running in MongoDB mode")
@@ -169,6 +318,9 @@ async def startup_event():
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await persist_local_metadata()
+    # Runs after the routers' shutdown hooks, so their last graph changes are included
+    await kg_store.close_knowledge_graph()
     await close_mongodb_connection()
 
 @app.get("/")
@@ -191,7 +343,7 @@ async def hello_world():
     # Log the response
     logger.info(f"Returning response: {response_message}")
     
-    return JSONResponse(
+    return ORJSONResponse(
         content={"message": response_message},
         status_code=200
     )
@@ -217,59 +369,90 @@ async def health_check():
         "storage_mode": "MongoDB" if mongodb_connected else "Local Storage"
     }
 
+# Extension -> MIME type table used when libmagic is unavailable
+EXTENSION_MIME_TYPES = MappingProxyType({
+    'txt': 'text/plain',
+    'pdf': 'application/pdf',
+    'doc': 'application/msword',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'png': 'image/png',
+    'gif': 'image/gif',
+    'mp4': 'video/mp4',
+    'mp3': 'audio/mpeg',
+    'json': 'application/json',
+    'csv': 'text/csv',
+    'xml': 'application/xml',
+    'html': 'text/html',
+    'css': 'text/css',
+    'js': 'application/javascript',
+    'py': 'text/x-python',
+    'md': 'text/markdown'
+})
+
 def detect_file_type(file_content: bytes, filename: str) -> str:
     """Detect file type using python-magic or fallback to extension"""
     try:
         if MONGODB_AVAILABLE:
-            import magic
-            mime_type = magic.from_buffer(file_content, mime=True)
+            # libmagic only inspects the start of a file, so don't hand it more than that
+            mime_type = mime_magic.from_buffer(file_content[:MAGIC_SNIFF_BYTES])
             return mime_type
     except Exception as e:
         logger.warning(f"Could not detect file type for {filename}: {str(e)}")
     
     # Fallback to extension-based detection
-    ext = filename.split('.')[-1].lower() if '.' in filename else 'unknown'
-    mime_types = {
-        'txt': 'text/plain',
-        'pdf': 'application/pdf',
-        'doc': 'application/msword',
-        'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-        'jpg': 'image/jpeg',
-        'jpeg': 'image/jpeg',
-        'png': 'image/png',
-        'gif': 'image/gif',
-        'mp4': 'video/mp4',
-        'mp3': 'audio/mpeg',
-        'json': 'application/json',
-        'csv': 'text/csv',
-        'xml': 'application/xml',
-        'html': 'text/html',
-        'css': 'text/css',
-        'js': 'application/javascript',
-        'py': 'text/x-python',
-        'md': 'text/markdown'
-    }
-    return mime_types.get(ext, f"application/{ext}")
+    ext = os.path.splitext(filename)[1][1:].lower() or 'unknown'
+    return EXTENSION_MIME_TYPES.get(ext, f"application/{ext}")
 
-async def store_file_mongodb(file: UploadFile, file_content: bytes, file_size: int, detected_type: str, category: str = None):
-    """Store file in MongoDB"""
-    # Create metadata
-    metadata = {
-        "filename": file.filename,
-        "content_type": file.content_type or detected_type,
-        "file_size": file_size,
-        "upload_date": datetime.now(),
-        "file_type": detected_type,
-        "original_content_type": file.content_type,
-        "category": category
-    }
+async def store_file_mongodb(file: UploadFile, category: str = None):
+    """Stream a file into MongoDB GridFS chunk by chunk"""
+    grid_in = fs_bucket.open_upload_stream(file.filename)
+    file_size = 0
+    head = b""  # First chunk, kept for type detection and searchable content
+    sha256 = hashlib.sha256()
     
-    # Store file in GridFS
-    file_id = await fs_bucket.upload_from_stream(
-        file.filename,
-        io.BytesIO(file_content),
-        metadata=metadata
-    )
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            if not head:
+                head = chunk
+            sha256.update(chunk)
+            await grid_in.write(chunk)
+            file_size += len(chunk)
+        
+        digest = sha256.hexdigest()
+        detected_type = detect_file_type(head, file.filename)
+        logger.info(f"Processing file: {file.filename}, detected_type: {detected_type}, size: {file_size}")
+        
+        # Identical content is already stored: drop the new chunks and point at the existing file
+        existing = await database[COLLECTION_NAME].find_one({"sha256": digest}, {"file_id": 1})
+        if existing:
+            await grid_in.abort()
+            file_id = existing["file_id"]
+            logger.info(f"Duplicate content for {file.filename}, reusing GridFS file {file_id}")
+        else:
+            # Create metadata (stored on the GridFS file document when the stream is closed)
+            metadata = {
+                "filename": file.filename,
+                "content_type": file.content_type or detected_type,
+                "file_size": file_size,
+                "upload_date": datetime.now(),
+                "file_type": detected_type,
+                "original_content_type": file.content_type,
+                "category": category,
+                "sha256": digest
+            }
+            await grid_in.set("metadata", metadata)
+    except Exception:
+        await grid_in.abort()
+        raise
+    
+    if not existing:
+        await grid_in.close()
+        file_id = grid_in._id
     
     # Store document metadata in collection
     document_record = {
@@ -282,16 +465,15 @@ async def store_file_mongodb(file: UploadFile, file_content: bytes, file_size: i
         "searchable_content": "",
         "tags": [],
         "description": "",
-        "category": category
+        "category": category,
+        "sha256": digest
     }
     
     # If it's a text file, store searchable content
     if detected_type.startswith('text/') or file.filename.endswith(('.txt', '.md', '.json', '.csv')):
-        try:
-            searchable_content = file_content.decode('utf-8')
-            document_record["searchable_content"] = searchable_content[:10000]  # Limit size
-        except UnicodeDecodeError:
-            logger.warning(f"Could not decode text content for {file.filename}")
+        # Decode only the bytes that can contribute to the first SEARCHABLE_CONTENT_CHARS characters
+        prefix = head[:SEARCHABLE_CONTENT_CHARS * 4]
+        document_record["searchable_content"] = prefix.decode('utf-8', errors='ignore')[:SEARCHABLE_CONTENT_CHARS]
     
     # Insert document record
     result = await database[COLLECTION_NAME].insert_one(document_record)
@@ -307,8 +489,28 @@ async def store_file_mongodb(file: UploadFile, file_content: bytes, file_size: i
         "storage": "MongoDB"
     }
 
-def store_file_local(file: UploadFile, file_content: bytes, file_size: int, detected_type: str, category: str = None):
-    """Store file locally"""
+def find_local_duplicate(digest: str) -> Optional[Path]:
+    """Path of an existing local upload with the given SHA-256 digest, if its file is still present"""
+    for doc in load_local_metadata():
+        if doc.get("sha256") == digest:
+            path = Path(doc["local_path"])
+            if path.exists():
+                return path
+    return None
+
+def link_to_existing_upload(existing_path: Path, file_path: Path):
+    """Replace a freshly written upload with a hard link to identical content already on disk"""
+    link_path = file_path.with_name(file_path.name + ".link")
+    try:
+        os.link(existing_path, link_path)
+        os.replace(link_path, file_path)
+        logger.info(f"Duplicate content for {file_path.name}, hard-linked to {existing_path.name}")
+    except OSError as e:
+        # Hard links are not supported everywhere (e.g. some network filesystems); keep the copy
+        logger.warning(f"Could not hard-link duplicate upload {file_path.name}: {e}")
+
+async def store_file_local(file: UploadFile, category: str = None):
+    """Stream a file to local storage chunk by chunk"""
     import uuid
     
     # Generate unique ID
@@ -318,9 +520,30 @@ def store_file_local(file: UploadFile, file_content: bytes, file_size: int, dete
     file_path = UPLOAD_DIR / f"{file_id}_{file.filename}"
     UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
     
-    # Save file locally
-    with open(file_path, 'wb') as f:
-        f.write(file_content)
+    # Save file locally without blocking the event loop
+    file_size = 0
+    head = b""  # First chunk, kept for type detection
+    sha256 = hashlib.sha256()
+    async with aiofiles.open(file_path, 'wb') as f:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            if not head:
+                head = chunk
+            sha256.update(chunk)
+            await f.write(chunk)
+            file_size += len(chunk)
+    
+    digest = sha256.hexdigest()
+    
+    # Identical content is already stored: replace the new copy with a hard link to it
+    duplicate_path = find_local_duplicate(digest)
+    if duplicate_path is not None:
+        link_to_existing_upload(duplicate_path, file_path)
+    
+    detected_type = detect_file_type(head, file.filename)
+    logger.info(f"Processing file: {file.filename}, detected_type: {detected_type}, size: {file_size}")
     
     # Create metadata record
     document_record = {
@@ -332,12 +555,13 @@ def store_file_local(file: UploadFile, file_content: bytes, file_size: int, dete
         "file_type": detected_type,
         "local_path": str(file_path),
         "category": category,
-        "storage": "Local"
+        "storage": "Local",
+        "sha256": digest
     }
     
     # Load existing metadata
     metadata = load_local_metadata()
-    metadata.append(document_record)
+    metadata.insert(0, document_record)  # Newest first
     save_local_metadata(metadata)
     
     return {
@@ -357,41 +581,42 @@ async def upload_files(files: List[UploadFile] = File(...), category: Optional[s
     if category:
         logger.info(f"Upload category: {category}")
     
-    uploaded_documents = []
     storage_mode = "MongoDB" if mongodb_connected else "Local Storage"
+    semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
     
-    for file in files:
-        try:
-            # Read file content
-            file_content = await file.read()
-            file_size = len(file_content)
-            
-            # Detect file type
-            detected_type = detect_file_type(file_content, file.filename)
-            
-            # Log file details
-            logger.info(f"Processing file: {file.filename}, detected_type: {detected_type}, size: {file_size}")
-            
-            # Store file based on available storage
+    async def store_one(file: UploadFile):
+        async with semaphore:
+            # Store file based on available storage (both stream the upload in chunks)
             if mongodb_connected:
-                document_info = await store_file_mongodb(file, file_content, file_size, detected_type, category)
+                document_info = await store_file_mongodb(file, category)
             else:
-                document_info = store_file_local(file, file_content, file_size, detected_type, category)
-            
-            uploaded_documents.append(document_info)
-            
+                document_info = await store_file_local(file, category)
             logger.info(f"Successfully stored file: {file.filename} (Storage: {storage_mode})")
-            
-        except Exception as e:
-            logger.error(f"Error processing file {file.filename}: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Error processing file {file.filename}: {str(e)}")
+            return document_info
+    
+    # Files are stored concurrently; one failure does not abandon the rest of the batch
+    results = await asyncio.gather(*(store_one(file) for file in files), return_exceptions=True)
     
-    logger.info(f"Upload completed successfully for {len(uploaded_documents)} files")
+    uploaded_documents = []
+    failed_files = []
+    for file, result in zip(files, results):
+        if isinstance(result, Exception):
+            logger.error(f"Error processing file {file.filename}: {str(result)}")
+            failed_files.append({"filename": file.filename, "error": str(result)})
+        else:
+            uploaded_documents.append(result)
     
-    return JSONResponse(
+    if failed_files and not uploaded_documents:
+        first = failed_files[0]
+        raise HTTPException(status_code=500, detail=f"Error processing file {first['filename']}: {first['error']}")
+    
+    logger.info(f"Upload completed for {len(uploaded_documents)} files ({len(failed_files)} failed)")
+    
+    return ORJSONResponse(
         content={
             "message": f"Successfully uploaded {len(uploaded_documents)} files ({storage_mode})",
             "documents": uploaded_documents,
+            "failed": failed_files,
             "storage_mode": storage_mode
         },
         status_code=200
@@ -410,17 +635,30 @@ async def get_documents(
         if mongodb_connected:
             # MongoDB implementation
             query = {}
-            if search:
-                query = {
-                    "$or": [
-                        {"filename": {"$regex": search, "$options": "i"}},
-                        {"searchable_content": {"$regex": search, "$options": "i"}},
-                        {"description": {"$regex": search, "$options": "i"}}
-                    ]
-                }
+            collation = None
+            if search and search.replace(" ", "").isalnum():
+                # Served by the text index on filename, searchable_content and description
+                query = {"$text": {"$search": search}}
+            elif search:
+                # Punctuated input (e.g. "report-2024.pdf") is matched as a case-insensitive filename
+                # prefix: a range under a strength-2 collation is served by the collated filename index
+                query = {"filename": {"$gte": search, "$lt": search + "\uffff"}}
+                collation = dict(FILENAME_COLLATION)
             
-            cursor = database[COLLECTION_NAME].find(query).sort("upload_date", -1).skip(skip).limit(limit)
-            documents = await cursor.to_list(length=limit)
+            # Fetch one extra document to learn whether another page exists without counting
+            cursor = (
+                database[COLLECTION_NAME]
+                .find(query, dict(DOCUMENT_LIST_PROJECTION))
+                .sort("upload_date", -1)
+                .skip(skip)
+                .limit(limit + 1)
+                .batch_size(limit + 1)
+            )
+            if collation:
+                cursor = cursor.collation(collation)
+            documents = await cursor.to_list(length=limit + 1)
+            has_more = len(documents) > limit
+            documents = documents[:limit]
             
             document_list = []
             for doc in documents:
@@ -439,7 +677,11 @@ async def get_documents(
                     "category": doc.get("category", "")
                 })
             
-            total_count = await database[COLLECTION_NAME].count_documents(query)
+            # The unfiltered total comes from collection metadata; search results are not counted
+            if search:
+                total_count = None
+            else:
+                total_count = await database[COLLECTION_NAME].estimated_document_count()
             
         else:
             # Local storage implementation
@@ -447,14 +689,14 @@ async def get_documents(
             
             # Apply search filter
             if search:
-                metadata = [doc for doc in metadata if search.lower() in doc["filename"].lower()]
-            
-            # Sort by upload date (newest first)
-            metadata.sort(key=lambda x: x["upload_date"], reverse=True)
+                query = search.lower()
+                metadata = [doc for doc in metadata if query in filename_lower(doc)]
             
+            # The cache is kept newest first, so pagination is a plain slice
             # Apply pagination
             total_count = len(metadata)
             document_list = metadata[skip:skip + limit]
+            has_more = (skip + len(document_list)) < total_count
 
             # Ensure upload_date is serializable
             for doc in document_list:
@@ -466,12 +708,12 @@ async def get_documents(
         
         logger.info(f"Returning {len(document_list)} documents (total: {total_count})")
         
-        return JSONResponse(
+        return ORJSONResponse(
             content={
                 "message": f"Found {len(document_list)} documents",
                 "documents": document_list,
                 "total_count": total_count,
-                "has_more": (skip + len(document_list)) < total_count,
+                "has_more": has_more,
                 "storage_mode": "MongoDB" if mongodb_connected else "Local Storage"
             },
             status_code=200
@@ -481,6 +723,14 @@ async def get_documents(
         logger.error(f"Error retrieving documents: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error retrieving documents: {str(e)}")
 
+async def iter_gridfs_file(grid_out):
+    """Yield a GridFS file chunk by chunk"""
+    while True:
+        chunk = await grid_out.readchunk()
+        if not chunk:
+            break
+        yield chunk
+
 # UUID pattern (8-4-4-4-12 hex)
 UUID_REGEX = r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$"
 
@@ -490,6 +740,9 @@ async def get_document(document_id: str = ApiPath(..., regex=UUID_REGEX)):
     """Get a specific document by ID"""
     logger.info(f"Document download endpoint accessed for ID: {document_id}")
     
+    if mongodb_connected and not ObjectId.is_valid(document_id):
+        raise HTTPException(status_code=400, detail="Invalid document ID format")
+    
     try:
         if mongodb_connected:
             # MongoDB implementation
@@ -502,46 +755,47 @@ async def get_document(document_id: str = ApiPath(..., regex=UUID_REGEX)):
         if not document:
             raise HTTPException(status_code=404, detail="Document not found")
         
+        upload_date = document["upload_date"]
+        if isinstance(upload_date, datetime):
+            upload_date = upload_date.isoformat()
+        
         if mongodb_connected:
-            # Get file from GridFS
+            # Get file from GridFS; chunks are sent as they are read, so the whole file is never held in memory
             file_id = document["file_id"]
             grid_out = await fs_bucket.open_download_stream(file_id)
-        else:
-            # Get file from local storage
-            file_path = Path(document["local_path"])
-            # If the stored path is relative and doesn't exist from CWD, resolve relative to backend directory
-            if not file_path.exists():
-                file_path = (Path(__file__).resolve().parent / file_path).resolve()
-            if not file_path.exists():
-                raise HTTPException(status_code=404, detail="Document not found locally")
-            # Open file synchronously
-            grid_out = file_path.open('rb')
+            logger.info(f"Document retrieved successfully: {document['filename']}")
+            return StreamingResponse(
+                iter_gridfs_file(grid_out),
+                media_type=document["content_type"],
+                headers={
+                    "Content-Disposition": f"attachment; filename={document['filename']}",
+                    "Content-Length": str(document["file_size"]),
+                    "Upload-Date": upload_date
+                }
+            )
         
-        # Read file content (await only if coroutine)
-        if hasattr(grid_out, "read") and callable(grid_out.read):
-            if asyncio.iscoroutinefunction(grid_out.read):
-                file_content = await grid_out.read()
-            else:
-                file_content = grid_out.read()
-        else:
-            file_content = b""
+        # Get file from local storage
+        file_path = Path(document["local_path"])
+        # If the stored path is relative and doesn't exist from CWD, resolve relative to backend directory
+        if not file_path.exists():
+            file_path = (Path(__file__).resolve().parent / file_path).resolve()
+        if not file_path.exists():
+            raise HTTPException(status_code=404, detail="Document not found locally")
         
         logger.info(f"Document retrieved successfully: {document['filename']}")
         
-        return StreamingResponse(
-            io.BytesIO(file_content),
+        # FileResponse sets Content-Length/Disposition itself and sends the file with sendfile where available
+        return FileResponse(
+            file_path,
             media_type=document["content_type"],
-            headers={
-                "Content-Disposition": f"attachment; filename={document['filename']}",
-                "Content-Length": str(document["file_size"]),
-                "Upload-Date": document["upload_date"]
-            }
+            filename=document["filename"],
+            headers={"Upload-Date": upload_date}
         )
         
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid document ID format")
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error retrieving document {document_id}: {str(e)}")
+        logger.exception(f"Error retrieving document {document_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error retrieving document: {str(e)}")
 
 @app.delete("/documents/{document_id}")
@@ -549,6 +803,9 @@ async def delete_document(document_id: str = ApiPath(..., regex=UUID_REGEX)):
     """Delete a specific document by ID"""
     logger.info(f"Document deletion endpoint accessed for ID: {document_id}")
     
+    if mongodb_connected and not ObjectId.is_valid(document_id):
+        raise HTTPException(status_code=400, detail="Invalid document ID format")
+    
     try:
         if mongodb_connected:
             # MongoDB implementation
@@ -562,9 +819,13 @@ async def delete_document(document_id: str = ApiPath(..., regex=UUID_REGEX)):
             raise HTTPException(status_code=404, detail="Document not found")
         
         if mongodb_connected:
-            # Delete file from GridFS
+            # Delete file from GridFS unless other (deduplicated) records still reference it
             file_id = document["file_id"]
-            await fs_bucket.delete(file_id)
+            shared = await database[COLLECTION_NAME].count_documents(
+                {"file_id": file_id, "_id": {"$ne": document["_id"]}}, limit=1
+            )
+            if not shared:
+                await fs_bucket.delete(file_id)
         else:
             # Delete file from local storage
             file_path = Path(document["local_path"])
@@ -581,22 +842,41 @@ async def delete_document(document_id: str = ApiPath(..., regex=UUID_REGEX)):
             metadata = load_local_metadata()
             metadata = [doc for doc in metadata if doc["id"] != document_id]
             save_local_metadata(metadata)
+            _filename_lower_index.pop(document_id, None)
         
         logger.info(f"Document deleted successfully: {document['filename']}")
         
-        return JSONResponse(
+        return ORJSONResponse(
             content={
                 "message": f"Document '{document['filename']}' deleted successfully"
             },
             status_code=200
         )
         
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid document ID format")
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error deleting document {document_id}: {str(e)}")
+        logger.exception(f"Error deleting document {document_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error deleting document: {str(e)}")
 
+def list_upload_files() -> set:
+    """Names of the regular files in the uploads directory, excluding the metadata file"""
+    # DirEntry.is_file() uses the type returned by readdir, so no extra stat per entry
+    with os.scandir(UPLOAD_DIR) as entries:
+        return {entry.name for entry in entries if entry.is_file() and entry.name != METADATA_FILE.name}
+
+def remove_upload_files(names) -> List[str]:
+    """Delete the named files from the uploads directory and return the ones that were removed"""
+    removed_files = []
+    for name in names:
+        try:
+            (UPLOAD_DIR / name).unlink()
+        except FileNotFoundError:
+            continue
+        removed_files.append(name)
+        logger.info(f"Removed orphaned file: {name}")
+    return removed_files
+
 @app.post("/cleanup")
 async def cleanup_orphaned_files():
     """Clean up any orphaned files that exist in uploads directory but not in metadata"""
@@ -606,7 +886,7 @@ async def cleanup_orphaned_files():
         if mongodb_connected:
             # For MongoDB, we'd need to check GridFS vs collection records
             # This is more complex and would require additional implementation
-            return JSONResponse(
+            return ORJSONResponse(
                 content={"message": "Cleanup not implemented for MongoDB mode yet"},
                 status_code=501
             )
@@ -621,23 +901,14 @@ async def cleanup_orphaned_files():
                     file_path = Path(doc['local_path'])
                     metadata_files.add(file_path.name)
             
-            # Get all files in uploads directory
-            upload_files = set()
-            for file_path in UPLOAD_DIR.glob("*"):
-                if file_path.is_file() and file_path.name != "metadata.json":
-                    upload_files.add(file_path.name)
+            # Get all files in uploads directory (one scandir pass, off the event loop)
+            upload_files = await asyncio.to_thread(list_upload_files)
             
             # Find orphaned files (in directory but not in metadata)
             orphaned_files = upload_files - metadata_files
             
             # Remove orphaned files
-            removed_files = []
-            for orphaned_file in orphaned_files:
-                file_path = UPLOAD_DIR / orphaned_file
-                if file_path.exists():
-                    file_path.unlink()
-                    removed_files.append(orphaned_file)
-                    logger.info(f"Removed orphaned file: {orphaned_file}")
+            removed_files = await asyncio.to_thread(remove_upload_files, orphaned_files)
             
             # Find missing files (in metadata but not in directory)
             missing_files = metadata_files - upload_files
@@ -655,7 +926,7 @@ async def cleanup_orphaned_files():
             
             logger.info(f"Cleanup completed: {len(removed_files)} orphaned files removed, {len(missing_files)} missing file entries cleaned")
             
-            return JSONResponse(
+            return ORJSONResponse(
                 content={
                     "message": "Cleanup completed successfully",
                     "orphaned_files_removed": len(removed_files),
@@ -716,17 +987,16 @@ async def get_document_stats():
             # Local storage implementation
             metadata = load_local_metadata()
             
+            # Total size and file type distribution in a single pass
             total_count = len(metadata)
-            total_size = sum(doc["file_size"] for doc in metadata)
-            avg_size = total_size / total_count if total_count > 0 else 0
-            
-            # File type distribution
-            type_counts = {}
+            total_size = 0
+            type_counts = Counter()
             for doc in metadata:
-                file_type = doc["file_type"]
-                type_counts[file_type] = type_counts.get(file_type, 0) + 1
+                total_size += doc["file_size"]
+                type_counts[doc["file_type"]] += 1
+            avg_size = total_size / total_count if total_count > 0 else 0
             
-            type_stats = [{"_id": k, "count": v} for k, v in sorted(type_counts.items(), key=lambda x: x[1], reverse=True)]
+            type_stats = [{"_id": k, "count": v} for k, v in type_counts.most_common()]
             
             stats = {
                 "total_documents": total_count,
@@ -738,12 +1008,39 @@ async def get_document_stats():
         
         logger.info(f"Document stats retrieved: {stats['total_documents']} documents")
         
-        return JSONResponse(content=stats, status_code=200)
+        return ORJSONResponse(content=stats, status_code=200)
         
     except Exception as e:
         logger.error(f"Error retrieving document stats: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error retrieving stats: {str(e)}")
 
+def build_knowledge_graph_payload(kg: KnowledgeGraph) -> bytes:
+    """Serialize the graph into the D3.js node/link JSON returned by /knowledge-graph"""
+    G = kg.graph
+    nodes = []
+    for node, data in G.nodes(data=True):
+        node_data = {"id": node}
+        node_data.update(data)
+        nodes.append(node_data)
+    
+    links = []
+    for source, target, data in G.edges(data=True):
+        link = {"source": source, "target": target}
+        link.update(data)
+        links.append(link)
+    
+    # Get training summary
+    training_summary = kg.get_training_summary()
+    
+    result = {
+        "nodes": nodes, 
+        "links": links,
+        "training_summary": training_summary
+    }
+    logger.info(f"Built knowledge graph payload with {len(nodes)} nodes and {len(links)} links")
+    logger.info(f"Training data: {training_summary['total_training_entries']} entries")
+    return orjson.dumps(result, default=str, option=orjson.OPT_NON_STR_KEYS)
+
 @app.get("/knowledge-graph")
 async def get_knowledge_graph():
     """
@@ -753,62 +1050,20 @@ async def get_knowledge_graph():
     logger.info("Knowledge graph endpoint accessed")
     
     try:
-        kg = KnowledgeGraph()
-        
-        # Try to load existing graph, if not found create a new one with examples
-        try:
-            kg.load("knowledge_graph.pkl")
-            logger.info("Loaded existing knowledge graph")
-        except Exception as e:
-            logger.info(f"No existing graph found, creating new one: {e}")
-            # Create example data as in the original script
-            kg.add_entry("Knowledge", "What is your expertise?", "AI, coding, philosophy")
-            kg.add_entry("Feelings", "How do you feel today?", "Curious and motivated")
-            kg.add_entry("Personalities", "Which of the Big Five fits you best?", "Openness to experience")
-            kg.add_entry("ImportanceOfPeople", "Who is most important in your life?", "Family and close friends")
-            kg.add_entry("Preferences", "What is your favorite hobby?", "Reading science fiction")
-            kg.add_entry("Morals", "Is honesty always the best policy?", "Usually, but context matters")
-            kg.add_entry("AutomaticQuestions", "What would you like to learn next?", "Graph databases")
-            kg.save("knowledge_graph.pkl")
-            logger.info("Created and saved new knowledge graph with example data")
-        
-        # Sync with training data
-        try:
-            kg.sync_with_training_data("training_data.json")
-            logger.info("Successfully synchronized knowledge graph with training data")
-            
-            # Save the updated graph
-            kg.save("knowledge_graph.pkl")
-            logger.info("Saved updated knowledge graph with training data")
-            
-        except Exception as e:
-            logger.warning(f"Could not sync training data: {e}")
-        
-        G = kg.graph
-        nodes = []
-        for node, data in G.nodes(data=True):
-            node_data = {"id": node}
-            node_data.update(data)
-            nodes.append(node_data)
-        
-        links = []
-        for source, target, data in G.edges(data=True):
-            link = {"source": source, "target": target}
-            link.update(data)
-            links.append(link)
-        
-        # Get training summary
-        training_summary = kg.get_training_summary()
+        # Sync with training data (the training routes own the records and the sync)
+        await sync_knowledge_graph()
         
-        result = {
-            "nodes": nodes, 
-            "links": links,
-            "training_summary": training_summary
-        }
-        logger.info(f"Returning knowledge graph with {len(nodes)} nodes and {len(links)} links")
-        logger.info(f"Training data: {training_summary['total_training_entries']} entries")
+        # Serializing is blocking, so it runs in a worker thread; the lock keeps the shared graph
+        # from changing meanwhile, and the payload is rebuilt only after the graph changed
+        async with kg_store.knowledge_graph_lock:
+            kg = await kg_store.get_knowledge_graph()
+            version = kg_store.knowledge_graph_version()
+            if app.state.kg_json_cache is None or app.state.kg_json_version != version:
+                app.state.kg_json_cache = await asyncio.to_thread(build_knowledge_graph_payload, kg)
+                app.state.kg_json_version = version
+            payload = app.state.kg_json_cache
         
-        return JSONResponse(content=result, status_code=200)
+        return Response(content=payload, media_type="application/json")
         
     except Exception as e:
         logger.error(f"Error retrieving knowledge graph: {str(e)}")
@@ -821,5 +1076,6 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=8089,
         reload=True,
-        log_level="info"
+        log_level="info",
+        **SERVER_OPTIONS
     ) 
\ No newline at end of file
@@ -1,78 +1,129 @@
-from fastapi import APIRouter, HTTPException, Query, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
-from typing import List, Dict, Optional, Union, Any
-import json
+from typing import List, Dict, Optional, Any
 import os
 from datetime import datetime
 import logging
 import sys
 from pathlib import Path
+from types import SimpleNamespace
 import asyncio
+import itertools
+import heapq
+from collections import Counter
+from routes.json_utils import json_dumps, json_loads
+try:
+    from bson import ObjectId
+except ImportError:
+    ObjectId = None
 from upload_processing.processors import KnowledgeGraphExtractor
 from upload_processing.utils import get_file_content
 try:
-    from analysis.graph import KnowledgeGraph
+    from analysis.graph import KnowledgeGraph, CATEGORIES
+    from analysis.store import knowledge_graph_lock, get_knowledge_graph, mark_knowledge_graph_changed
 except ImportError:
     KnowledgeGraph = None
-
-# Add the parent directory to the path to import utilities
-sys.path.append(str(Path(__file__).parent.parent))
-
-# --- Robust import of backend main module and shared helpers ---
-import importlib
-
-# Try to get the already-loaded main module first to avoid duplicate imports
-main_mod = sys.modules.get("main")
-
-# If not found, attempt to import it using common module paths
-if main_mod is None:
+    CATEGORIES = []
+
+# --- Shared storage state from the backend main module ---
+# main imports this router before it has finished loading, so its shared objects are bound on
+# first use instead of at import time; afterwards requests read them through plain references
+COLLECTION_NAME = "documents"
+# Ensure we reference the correct uploads directory relative to the backend package
+UPLOAD_DIR = Path(__file__).resolve().parent.parent / "uploads"
+METADATA_FILE = UPLOAD_DIR / "metadata.json"
+
+# Used when the router runs without the main module (local storage only)
+_LOCAL_STORAGE_STATE = SimpleNamespace(mongodb_connected=False, database=None, fs_bucket=None)
+_storage_state = None
+_main_load_local_metadata = None
+
+def _bind_main_module():
+    """Bind main's storage_state and metadata loader once main is loaded"""
+    global _storage_state, _main_load_local_metadata
+    main_mod = sys.modules.get("main") or sys.modules.get("Model_Myself.backend.main")
+    if main_mod is not None and hasattr(main_mod, "storage_state"):
+        _storage_state = main_mod.storage_state
+        _main_load_local_metadata = main_mod.load_local_metadata
+
+def _get_storage_state() -> SimpleNamespace:
+    """Current MongoDB connection state (local-only if main is not loaded)"""
+    if _storage_state is None:
+        _bind_main_module()
+    return _storage_state or _LOCAL_STORAGE_STATE
+
+def load_local_metadata():
+    """Local document metadata: main's in-memory cache when available, otherwise read from the file"""
+    if _main_load_local_metadata is None:
+        _bind_main_module()
+    if _main_load_local_metadata is not None:
+        return _main_load_local_metadata()
     try:
-        main_mod = importlib.import_module("main")
-    except ImportError:
-        try:
-            main_mod = importlib.import_module("Model_Myself.backend.main")
-        except ImportError:
-            main_mod = None
-
-if main_mod:
-    mongodb_connected = getattr(main_mod, "mongodb_connected", False)
-    database = getattr(main_mod, "database", None)
-    COLLECTION_NAME = getattr(main_mod, "COLLECTION_NAME", "documents")
-    load_local_metadata = getattr(main_mod, "load_local_metadata", None)
-    UPLOAD_DIR = getattr(main_mod, "UPLOAD_DIR", Path(__file__).resolve().parent.parent / "uploads")
-    METADATA_FILE = getattr(main_mod, "METADATA_FILE", UPLOAD_DIR / "metadata.json")
-    # fallback loader that reads the local metadata file directly
-    def load_local_metadata():
-        try:
-            with open(METADATA_FILE, "r") as f:
-                return json.load(f)
-        except Exception:
-            return []
-else:
-    # Fallback if main module cannot be imported
-    mongodb_connected = False
-    database = None
-    COLLECTION_NAME = "documents"
-    # Ensure we reference the correct uploads directory relative to the backend package
-    UPLOAD_DIR = Path(__file__).resolve().parent.parent / "uploads"
-    METADATA_FILE = UPLOAD_DIR / "metadata.json"
-    # fallback loader that reads the local metadata file directly
-    def load_local_metadata():
-        try:
-            with open(METADATA_FILE, "r") as f:
-                return json.load(f)
-        except Exception:
-            return []
-# --- end robust import block ---
+        with open(METADATA_FILE, "rb") as f:
+            return json_loads(f.read())
+    except Exception:
+        return []
+# --- end shared storage state ---
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Analysis data file path
-ANALYSIS_DATA_FILE = "upload_processing/analysis_results.json"
+# Analysis data file path (append-only JSON Lines log; the last line for a document wins)
+ANALYSIS_DATA_FILE = "upload_processing/analysis_results.jsonl"
+# Pre-JSONL results file, imported once when no log exists yet
+LEGACY_ANALYSIS_DATA_FILE = "upload_processing/analysis_results.json"
 ANALYSIS_QUEUE_FILE = "upload_processing/analysis_queue.json"
 
+# The log is rewritten once it holds more than this many lines per live record (and at least
+# ANALYSIS_LOG_COMPACT_MIN_LINES lines, so small logs are not rewritten constantly)
+ANALYSIS_LOG_COMPACT_RATIO = 2
+ANALYSIS_LOG_COMPACT_MIN_LINES = 1000
+
+# Analysis files are read and written through a buffer of this size so each dump is a few large writes
+ANALYSIS_IO_BUFFER_SIZE = 1 << 20
+
+# In-memory view of the analysis log keyed by document id, loaded on first use
+_analysis_index: Optional[Dict[str, dict]] = None
+# Number of indexed records per status, with the status each document was counted under
+# (records are updated in place before being saved, so the old status cannot be read back)
+_analysis_status_counts: Counter = Counter()
+_analysis_counted_status: Dict[str, str] = {}
+_analysis_log_lines = 0
+# (mtime_ns, size) of the log as of our last read or write; a mismatch means another process wrote it
+_analysis_log_signature = None
+
+# Number of analyses run concurrently by the queue workers
+ANALYSIS_WORKER_COUNT = 4
+DEFAULT_ANALYSIS_PRIORITY = 5
+
+# Pending analyses as (priority, sequence, document_id, analysis_types); the sequence number keeps
+# equal priorities first-in first-out. Created with its workers on the first /analyze request.
+_analysis_queue: Optional[asyncio.PriorityQueue] = None
+_analysis_sequence = itertools.count()
+_analysis_workers: List[asyncio.Task] = []
+
+# Categories accepted by KnowledgeGraph.add_entry, keyed by casefolded name so LLM output like
+# " knowledge" still matches; extracted entries outside them go under the default
+KG_CATEGORY_LOOKUP = {c.casefold(): c for c in CATEGORIES}
+DEFAULT_KG_CATEGORY = "Knowledge"
+
+# Fields read by get_document_info; skips searchable_content and other large fields
+DOCUMENT_INFO_PROJECTION = {
+    "filename": 1,
+    "file_type": 1,
+    "file_size": 1,
+    "content_type": 1,
+    "upload_date": 1,
+    "category": 1,
+    "file_id": 1
+}
+
+# Local document metadata keyed by id, and the metadata list it was built from
+_metadata_index: Dict[str, dict] = {}
+_metadata_index_source = None
+_metadata_index_size = -1
+
 # Ensure upload_processing directory exists
 UPLOAD_PROCESSING_DIR = Path("upload_processing")
 UPLOAD_PROCESSING_DIR.mkdir(exist_ok=True)
@@ -104,31 +155,141 @@ class AnalysisQueueItem(BaseModel):
     created_at: datetime
     status: str  # "queued", "processing", "completed", "failed"
 
-def load_analysis_data():
-    """Load analysis results from file"""
+def _atomic_write(path: str, data: bytes):
+    """
+    Write a file via a temporary file and os.replace, so a crash or a concurrent reader
+    never sees it truncated or half written.
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb', buffering=ANALYSIS_IO_BUFFER_SIZE) as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def _encode_analysis_line(record: dict) -> bytes:
+    """Serialize one record as a compact JSON line"""
+    return json_dumps(record) + b"\n"
+
+def _read_analysis_log() -> Dict[str, dict]:
+    """Replay the analysis log (or import the legacy JSON file) into a dict keyed by document id"""
+    global _analysis_log_lines
+    index = {}
+    lines = 0
     try:
         if Path(ANALYSIS_DATA_FILE).exists():
-            with open(ANALYSIS_DATA_FILE, 'r') as f:
-                return json.load(f)
-        return []
+            with open(ANALYSIS_DATA_FILE, 'rb', buffering=ANALYSIS_IO_BUFFER_SIZE) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json_loads(line)
+                    except ValueError:
+                        # A torn final line from an interrupted append
+                        logger.warning("Skipping unreadable line in analysis log")
+                        continue
+                    lines += 1
+                    if record.get("deleted"):
+                        index.pop(record["document_id"], None)
+                    else:
+                        index[record["document_id"]] = record
+        elif Path(LEGACY_ANALYSIS_DATA_FILE).exists():
+            with open(LEGACY_ANALYSIS_DATA_FILE, 'rb', buffering=ANALYSIS_IO_BUFFER_SIZE) as f:
+                for record in json_loads(f.read()):
+                    index[record["document_id"]] = record
+            logger.info("Imported %s analysis records from %s", len(index), LEGACY_ANALYSIS_DATA_FILE)
     except Exception as e:
         logger.error(f"Error loading analysis data: {e}")
-        return []
+    _analysis_log_lines = lines
+    return index
+
+def _analysis_log_stat():
+    """Return (mtime_ns, size) of the analysis log, or None if it does not exist"""
+    try:
+        st = os.stat(ANALYSIS_DATA_FILE)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def _get_analysis_index() -> Dict[str, dict]:
+    """Return the in-memory analysis index, replaying the log on first use or when it changed on disk"""
+    global _analysis_index, _analysis_log_signature
+    signature = _analysis_log_stat()
+    if _analysis_index is None or signature != _analysis_log_signature:
+        _analysis_index = _read_analysis_log()
+        _analysis_log_signature = signature
+        _recount_analysis_statuses()
+        if _analysis_log_lines != len(_analysis_index):
+            _compact_analysis_log()
+    return _analysis_index
+
+def _recount_analysis_statuses():
+    """Rebuild the per-status counts from the freshly loaded index"""
+    _analysis_counted_status.clear()
+    for document_id, record in _analysis_index.items():
+        _analysis_counted_status[document_id] = record["status"]
+    _analysis_status_counts.clear()
+    _analysis_status_counts.update(_analysis_counted_status.values())
+
+def _count_analysis_status(document_id: str, status: Optional[str]):
+    """Move a document's entry in the per-status counts to status (None removes it)"""
+    previous = _analysis_counted_status.pop(document_id, None)
+    if previous is not None:
+        _analysis_status_counts[previous] -= 1
+    if status is not None:
+        _analysis_counted_status[document_id] = status
+        _analysis_status_counts[status] += 1
+
+def _compact_analysis_log():
+    """Rewrite the log with one line per live record"""
+    global _analysis_log_lines, _analysis_log_signature
+    try:
+        _atomic_write(ANALYSIS_DATA_FILE, b"".join(map(_encode_analysis_line, _analysis_index.values())))
+        _analysis_log_lines = len(_analysis_index)
+        _analysis_log_signature = _analysis_log_stat()
+    except Exception as e:
+        logger.error(f"Error compacting analysis log: {e}")
 
-def save_analysis_data(data):
-    """Save analysis results to file"""
+def _append_analysis_log(record: dict):
+    """Append one record to the log, compacting it when it has grown well past the live set"""
+    global _analysis_log_lines, _analysis_log_signature
     try:
-        with open(ANALYSIS_DATA_FILE, 'w') as f:
-            json.dump(data, f, indent=2, default=str)
+        with open(ANALYSIS_DATA_FILE, 'ab') as f:
+            f.write(_encode_analysis_line(record))
+        _analysis_log_lines += 1
+        _analysis_log_signature = _analysis_log_stat()
     except Exception as e:
         logger.error(f"Error saving analysis data: {e}")
+        return
+    if (_analysis_log_lines > ANALYSIS_LOG_COMPACT_MIN_LINES
+            and _analysis_log_lines > ANALYSIS_LOG_COMPACT_RATIO * len(_analysis_index)):
+        _compact_analysis_log()
+
+def load_analysis_data():
+    """Load all analysis results"""
+    return list(_get_analysis_index().values())
+
+def save_analysis_data(record: dict):
+    """Save a single analysis record (appended to the log; replaces any earlier record for the document)"""
+    _get_analysis_index()[record["document_id"]] = record
+    _count_analysis_status(record["document_id"], record["status"])
+    _append_analysis_log(record)
+
+def delete_analysis_data(document_id: str) -> bool:
+    """Delete the analysis record for a document, returning False if there was none"""
+    index = _get_analysis_index()
+    if index.pop(document_id, None) is None:
+        return False
+    _count_analysis_status(document_id, None)
+    _append_analysis_log({"document_id": document_id, "deleted": True})
+    return True
 
 def load_analysis_queue():
     """Load analysis queue from file"""
     try:
         if Path(ANALYSIS_QUEUE_FILE).exists():
-            with open(ANALYSIS_QUEUE_FILE, 'r') as f:
-                return json.load(f)
+            with open(ANALYSIS_QUEUE_FILE, 'rb', buffering=ANALYSIS_IO_BUFFER_SIZE) as f:
+                return json_loads(f.read())
         return []
     except Exception as e:
         logger.error(f"Error loading analysis queue: {e}")
@@ -137,31 +298,49 @@ def load_analysis_queue():
 def save_analysis_queue(queue):
     """Save analysis queue to file"""
     try:
-        with open(ANALYSIS_QUEUE_FILE, 'w') as f:
-            json.dump(queue, f, indent=2, default=str)
+        # Serialized in one call and written in one go instead of json.dump's many small writes
+        _atomic_write(ANALYSIS_QUEUE_FILE, json_dumps(queue))
     except Exception as e:
         logger.error(f"Error saving analysis queue: {e}")
 
+def _local_metadata_index(metadata: List[dict]) -> Dict[str, dict]:
+    """Index local metadata records by id, rebuilt only when the metadata list changes"""
+    global _metadata_index, _metadata_index_source, _metadata_index_size
+    # main keeps one cached list that uploads insert into and deletes replace, so identity plus
+    # length identifies its contents
+    if metadata is not _metadata_index_source or len(metadata) != _metadata_index_size:
+        _metadata_index = {doc["id"]: doc for doc in metadata}
+        _metadata_index_source = metadata
+        _metadata_index_size = len(metadata)
+    return _metadata_index
+
+def find_local_document(document_id: str) -> Optional[dict]:
+    """Find one local document's metadata record by id"""
+    # main's in-memory list is authoritative (the file lags behind pending write-backs), so the
+    # lookup goes through it and its id index rather than streaming the file
+    metadata = load_local_metadata()
+    # Only build the sample list when debug output is actually emitted
+    if metadata and logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Loaded local metadata entries: %s", len(metadata))
+        sample_ids = [m.get('id') for m in metadata[:10]]
+        logger.debug("First 10 document IDs in metadata: %s", sample_ids)
+    return _local_metadata_index(metadata).get(document_id)
+
 async def get_document_info(document_id: str):
     """Get document information from MongoDB or local storage"""
-    logger.debug(f"get_document_info() called with id={document_id}")
+    logger.debug("get_document_info() called with id=%s", document_id)
     try:
-        # Get current MongoDB connection status from main module
-        main_mod = sys.modules.get("main")
-        current_mongodb_connected = False
-        current_database = None
-        
-        if main_mod:
-            current_mongodb_connected = getattr(main_mod, "mongodb_connected", False)
-            current_database = getattr(main_mod, "database", None)
+        state = _get_storage_state()
+        current_database = state.database
         
-        logger.debug(f"Current MongoDB connection status: {current_mongodb_connected}")
+        logger.debug("Current MongoDB connection status: %s", state.mongodb_connected)
         
-        if current_mongodb_connected and current_database is not None:
-            from bson import ObjectId
+        if state.mongodb_connected and current_database is not None:
             try:
-                document = await current_database[COLLECTION_NAME].find_one({"_id": ObjectId(document_id)})
-                logger.debug(f"MongoDB query result: {document is not None}")
+                document = await current_database[COLLECTION_NAME].find_one(
+                    {"_id": ObjectId(document_id)}, DOCUMENT_INFO_PROJECTION
+                )
+                logger.debug("MongoDB query result: %s", document is not None)
                 if document:
                     return {
                         "id": str(document["_id"]),
@@ -179,24 +358,9 @@ async def get_document_info(document_id: str):
                 # Fall through to local storage
         
         # Local storage fallback
-        if callable(load_local_metadata):
-            metadata = load_local_metadata()
-        else:
-            # Direct file loading if import failed
-            try:
-                with open(METADATA_FILE, 'r') as f:
-                    metadata = json.load(f)
-            except:
-                metadata = []
-
-        logger.debug(f"Loaded local metadata entries: {len(metadata)}")
-        if metadata:
-            sample_ids = [m.get('id') for m in metadata[:10]]
-            logger.debug(f"First 10 document IDs in metadata: {sample_ids}")
-
-        document = next((doc for doc in metadata if doc["id"] == document_id), None)
+        document = find_local_document(document_id)
         if not document:
-            logger.warning(f"Document id {document_id} not found in local metadata. Total entries: {len(metadata)}")
+            logger.warning(f"Document id {document_id} not found in local metadata")
         if document:
             return {
                 "id": document["id"],
@@ -212,55 +376,136 @@ async def get_document_info(document_id: str):
         logger.error(f"Error getting document info for {document_id}: {e}")
     return None
 
+# Analysis types that read the document content in run_analysis
+CONTENT_ANALYSIS_TYPES = frozenset({"knowledge_extraction", "text_extraction", "metadata"})
+
+# Stateless, so one extractor serves every analysis
+_kg_extractor = KnowledgeGraphExtractor()
+
+async def run_analysis(analysis_type: str, content: Optional[str], document_info: dict) -> Optional[Dict[str, Any]]:
+    """Run a single analysis type, returning None for unsupported types"""
+    if analysis_type == "knowledge_extraction":
+        return await _kg_extractor.process(content or "", document_info)
+    elif analysis_type == "text_extraction":
+        return {
+            "extracted_text": content or "",
+            "text_length": len(content or ""),
+            "language": "en"
+        }
+    # keep existing simple placeholders for other types
+    elif analysis_type == "sentiment":
+        return {
+            "score": 0.0,
+            "label": "neutral",
+            "confidence": 0.5
+        }
+    elif analysis_type == "keywords":
+        return {
+            "keywords": [],
+            "confidence_scores": []
+        }
+    elif analysis_type == "summary":
+        return {
+            "summary": "",
+            "summary_length": 0,
+            "compression_ratio": 0.0
+        }
+    elif analysis_type == "metadata":
+        return {
+            "word_count": len((content or "").split()),
+            "character_count": len(content or "")
+        }
+    return None
+
+def store_knowledge_entries(kg: KnowledgeGraph, document_info: dict, entries: List[dict]):
+    """Attach extracted entries to the graph under a blue node for the document; returns (doc_node_id, added_entries)"""
+    # Ensure main Documents hub exists
+    if "Documents" not in kg.graph:
+        kg.graph.add_node("Documents", type="document_main", color="blue")
+        logger.info("🔵 Created main 'Documents' hub node - marked BLUE (type=document_main)")
+    else:
+        logger.info("🔵 Main 'Documents' hub node already exists - ensuring BLUE color")
+        kg.graph.nodes["Documents"]["color"] = "blue"  # Ensure it stays blue
+
+    # Create (or fetch existing) node for this specific document
+    doc_node_id = f"Doc_{document_info['id']}"
+    if doc_node_id not in kg.graph:
+        kg.graph.add_node(
+            doc_node_id,
+            type="document_instance",  # This ensures blue color in frontend visualization
+            filename=document_info.get("filename", ""),
+            document_id=document_info["id"],
+            file_type=document_info.get("file_type", ""),
+            file_size=document_info.get("file_size", 0),
+            upload_date=str(document_info.get("upload_date", "")),
+            analysis_timestamp=datetime.now().isoformat(),
+            color="blue"  # Explicit blue color marking for knowledge graph visualization
+        )
+        kg.graph.add_edge("Documents", doc_node_id)
+        logger.info("🔵 Created BLUE document node: %s for file '%s' (type=document_instance)", doc_node_id, document_info.get('filename', ''))
+    else:
+        # Update existing node with latest analysis timestamp
+        kg.graph.nodes[doc_node_id]["analysis_timestamp"] = datetime.now().isoformat()
+        logger.info("🔵 Updated existing BLUE document node: %s with new analysis timestamp", doc_node_id)
+
+    # Build every extracted entry and its links to this document node, then add them in two batch calls
+    nodes_to_add = []
+    edges_to_add = []
+    debug_enabled = logger.isEnabledFor(logging.DEBUG)
+    for i, entry in enumerate(entries):
+        category = entry.get("category", "Knowledge")
+        question = entry.get("question", "Unknown question")
+        answer = entry.get("answer", "")
+
+        if debug_enabled:
+            logger.debug("Processing entry %s: Category='%s', Question='%s...', Answer='%s...'", i+1, category, question[:50], answer[:50])
+
+        # Normalise to a known category, falling back to the default so build_entry never raises here
+        matched = KG_CATEGORY_LOOKUP.get(category.strip().casefold()) if isinstance(category, str) else None
+        if matched is None:
+            logger.warning(f"Category '{category}' not valid, using '{DEFAULT_KG_CATEGORY}' fallback")
+            matched = DEFAULT_KG_CATEGORY
+        category = matched
+        node_id, attrs, category_edge = kg.build_entry(category, question, answer)
+        nodes_to_add.append((node_id, attrs))
+        edges_to_add.append(category_edge)
+        edges_to_add.append((doc_node_id, node_id, {"relation": "contains"}))
+        if debug_enabled:
+            logger.debug("Built knowledge entry %s linked from %s (contains)", node_id, doc_node_id)
+
+    kg.graph.add_nodes_from(nodes_to_add)
+    kg.graph.add_edges_from(edges_to_add)
+    added_entries = len(nodes_to_add)
+
+    return doc_node_id, added_entries
+
 async def analyze_document_placeholder(document_info: dict, analysis_types: List[str]) -> Dict[str, Any]:
     """
     Updated analysis function that supports knowledge_extraction via LLM
     """
-    logger.info(f"Analyzing document: {document_info['filename']} with types: {analysis_types}")
+    logger.info("Analyzing document: %s with types: %s", document_info['filename'], analysis_types)
 
     results = {}
 
-    # Load file content when needed
+    # Load file content once, shared by every requested type that reads it
     content: Optional[str] = None
-    if any(at in analysis_types for at in ["knowledge_extraction"]):
+    if not CONTENT_ANALYSIS_TYPES.isdisjoint(analysis_types):
         content = await get_file_content(document_info)
         if content is None:
-            logger.error("Failed to retrieve file content for knowledge extraction")
-
-    for analysis_type in analysis_types:
-        if analysis_type == "knowledge_extraction":
-            kg_extractor = KnowledgeGraphExtractor()
-            res = await kg_extractor.process(content or "", document_info)
-            results[analysis_type] = res
-        elif analysis_type == "text_extraction":
-            results["text_extraction"] = {
-                "extracted_text": content or "",
-                "text_length": len(content or ""),
-                "language": "en"
-            }
-        # keep existing simple placeholders for other types
-        elif analysis_type == "sentiment":
-            results["sentiment"] = {
-                "score": 0.0,
-                "label": "neutral",
-                "confidence": 0.5
-            }
-        elif analysis_type == "keywords":
-            results["keywords"] = {
-                "keywords": [],
-                "confidence_scores": []
-            }
-        elif analysis_type == "summary":
-            results["summary"] = {
-                "summary": "",
-                "summary_length": 0,
-                "compression_ratio": 0.0
-            }
-        elif analysis_type == "metadata":
-            results["metadata"] = {
-                "word_count": len((content or "").split()),
-                "character_count": len(content or "")
-            }
+            logger.error("Failed to retrieve file content for analysis")
+
+    # Independent analyses run concurrently so the LLM round trip does not hold up the others;
+    # a failing type is reported as {"error": ...} like the extractors' own errors
+    outcomes = await asyncio.gather(
+        *(run_analysis(analysis_type, content, document_info) for analysis_type in analysis_types),
+        return_exceptions=True
+    )
+    for analysis_type, outcome in zip(analysis_types, outcomes):
+        if isinstance(outcome, Exception):
+            logger.error(f"{analysis_type} analysis failed for {document_info['filename']}: {outcome}")
+            results[analysis_type] = {"error": str(outcome)}
+        elif outcome is not None:
+            results[analysis_type] = outcome
 
     # If knowledge entries extracted, store them into KnowledgeGraph under a new blue document node
     kg_res = results.get("knowledge_extraction")
@@ -268,73 +513,19 @@ async def analyze_document_placeholder(document_info: dict, analysis_types: List
         logger.warning(f"Knowledge extraction returned error: {kg_res['error']}")
     if kg_res and isinstance(kg_res, dict) and kg_res.get("entries") and KnowledgeGraph:
         try:
-            logger.info(f"Processing {len(kg_res['entries'])} knowledge graph entries from document analysis")
-            kg = KnowledgeGraph()
-            # Load existing graph if present
-            try:
-                kg.load("knowledge_graph.pkl")
-                logger.info(f"Loaded existing knowledge graph with {len(kg.graph.nodes)} nodes and {len(kg.graph.edges)} edges")
-            except Exception as e:
-                logger.info(f"No existing knowledge graph found, creating new one: {e}")
-
-            # Ensure main Documents hub exists
-            if "Documents" not in kg.graph:
-                kg.graph.add_node("Documents", type="document_main", color="blue")
-                logger.info("🔵 Created main 'Documents' hub node - marked BLUE (type=document_main)")
-            else:
-                logger.info("🔵 Main 'Documents' hub node already exists - ensuring BLUE color")
-                kg.graph.nodes["Documents"]["color"] = "blue"  # Ensure it stays blue
-
-            # Create (or fetch existing) node for this specific document
-            doc_node_id = f"Doc_{document_info['id']}"
-            if doc_node_id not in kg.graph:
-                kg.graph.add_node(
-                    doc_node_id,
-                    type="document_instance",  # This ensures blue color in frontend visualization
-                    filename=document_info.get("filename", ""),
-                    document_id=document_info["id"],
-                    file_type=document_info.get("file_type", ""),
-                    file_size=document_info.get("file_size", 0),
-                    upload_date=str(document_info.get("upload_date", "")),
-                    analysis_timestamp=datetime.now().isoformat(),
-                    color="blue"  # Explicit blue color marking for knowledge graph visualization
-                )
-                kg.graph.add_edge("Documents", doc_node_id)
-                logger.info(f"🔵 Created BLUE document node: {doc_node_id} for file '{document_info.get('filename', '')}' (type=document_instance)")
-            else:
-                # Update existing node with latest analysis timestamp
-                kg.graph.nodes[doc_node_id]["analysis_timestamp"] = datetime.now().isoformat()
-                logger.info(f"🔵 Updated existing BLUE document node: {doc_node_id} with new analysis timestamp")
-
-            # Add each extracted entry and connect to this document node
-            added_entries = 0
-            for i, entry in enumerate(kg_res["entries"]):
-                category = entry.get("category", "Knowledge")
-                question = entry.get("question", "Unknown question")
-                answer = entry.get("answer", "")
-
-                logger.debug(f"Processing entry {i+1}: Category='{category}', Question='{question[:50]}...', Answer='{answer[:50]}...'")
-
-                # Use fallback category if unknown
-                try:
-                    node_id = kg.add_entry(category, question, answer)
-                    logger.debug(f"Added knowledge entry with node ID: {node_id}")
-                except ValueError as e:
-                    logger.warning(f"Category '{category}' not valid, using 'Knowledge' fallback: {e}")
-                    node_id = kg.add_entry("Knowledge", question, answer)
-
-                kg.add_relationship(doc_node_id, node_id, "contains")
-                logger.debug(f"Added relationship: {doc_node_id} -> {node_id} (contains)")
-                added_entries += 1
-
-            logger.info(f"Successfully processed {added_entries} knowledge graph entries")
+            logger.info("Processing %s knowledge graph entries from document analysis", len(kg_res['entries']))
+            # The shared graph stays resident; the change is written back by its delayed flush
+            async with knowledge_graph_lock:
+                kg = await get_knowledge_graph()
+                doc_node_id, added_entries = store_knowledge_entries(kg, document_info, kg_res["entries"])
+                mark_knowledge_graph_changed()
             
-            # Save the updated graph
-            kg.save("knowledge_graph.pkl")
-            logger.info(f"Saved updated knowledge graph with {len(kg.graph.nodes)} nodes and {len(kg.graph.edges)} edges to knowledge_graph.pkl")
+            logger.info("Successfully processed %s knowledge graph entries", added_entries)
+            logger.info("Knowledge graph now has %s nodes and %s edges (write-back scheduled)", len(kg.graph.nodes), len(kg.graph.edges))
             
             logger.info(
-                f"Knowledge graph integration complete: {added_entries} entries from document '{document_info.get('filename', '')}' stored under node {doc_node_id}"
+                "Knowledge graph integration complete: %s entries from document '%s' stored under node %s",
+                added_entries, document_info.get('filename', ''), doc_node_id
             )
         except Exception as e:
             logger.error(f"Failed to store entries in knowledge graph: {e}")
@@ -345,23 +536,23 @@ async def analyze_document_placeholder(document_info: dict, analysis_types: List
 
 async def process_document_analysis(document_id: str, analysis_types: List[str]):
     """Background task to process document analysis"""
-    logger.info(f"Starting analysis for document {document_id}")
+    logger.info("Starting analysis for document %s", document_id)
     
     # Get document info
     document_info = await get_document_info(document_id)
     if not document_info:
         logger.error(f"Document {document_id} not found")
+        # Fail the queued record so it is not counted as pending (or re-queued) forever
+        analysis_record = _get_analysis_index().get(document_id)
+        if analysis_record:
+            analysis_record["status"] = "failed"
+            analysis_record["error_message"] = "Document not found"
+            analysis_record["completed_at"] = datetime.now().isoformat()
+            save_analysis_data(analysis_record)
         return
     
-    # Load analysis data
-    analysis_data = load_analysis_data()
-    
     # Create or update analysis record
-    analysis_record = None
-    for record in analysis_data:
-        if record["document_id"] == document_id:
-            analysis_record = record
-            break
+    analysis_record = _get_analysis_index().get(document_id)
     
     if not analysis_record:
         analysis_record = {
@@ -377,14 +568,13 @@ async def process_document_analysis(document_id: str, analysis_types: List[str])
             "completed_at": None,
             "processing_time_seconds": None
         }
-        analysis_data.append(analysis_record)
     else:
         analysis_record["status"] = "processing"
         analysis_record["started_at"] = datetime.now().isoformat()
         analysis_record["error_message"] = None
     
     # Save initial state
-    save_analysis_data(analysis_data)
+    save_analysis_data(analysis_record)
     
     try:
         # Perform analysis
@@ -398,7 +588,7 @@ async def process_document_analysis(document_id: str, analysis_types: List[str])
         analysis_record["completed_at"] = end_time.isoformat()
         analysis_record["processing_time_seconds"] = (end_time - start_time).total_seconds()
         
-        logger.info(f"Analysis completed for document {document_id}")
+        logger.info("Analysis completed for document %s", document_id)
         
     except Exception as e:
         # Update record with error
@@ -409,17 +599,80 @@ async def process_document_analysis(document_id: str, analysis_types: List[str])
         logger.error(f"Analysis failed for document {document_id}: {e}")
     
     # Save final state
-    save_analysis_data(analysis_data)
+    save_analysis_data(analysis_record)
+
+async def _analysis_worker():
+    """Run queued analyses in priority order"""
+    while True:
+        _, _, document_id, analysis_types = await _analysis_queue.get()
+        try:
+            await process_document_analysis(document_id, analysis_types)
+        except Exception as e:
+            logger.error(f"Unexpected error analysing document {document_id}: {e}")
+        finally:
+            _analysis_queue.task_done()
+
+def _get_analysis_queue() -> asyncio.PriorityQueue:
+    """Return the analysis queue, starting its workers on first use"""
+    global _analysis_queue
+    if _analysis_queue is None:
+        _analysis_queue = asyncio.PriorityQueue()
+        for _ in range(ANALYSIS_WORKER_COUNT):
+            _analysis_workers.append(asyncio.create_task(_analysis_worker()))
+    return _analysis_queue
+
+def queue_document_analysis(document_info: dict, analysis_types: List[str], priority: int):
+    """Record a document as queued and hand it to the analysis workers"""
+    document_id = document_info["id"]
+    analysis_record = _get_analysis_index().get(document_id)
+    if not analysis_record:
+        analysis_record = {
+            "document_id": document_id,
+            "filename": document_info["filename"],
+            "file_type": document_info["file_type"],
+            "file_size": document_info["file_size"],
+            "results": None,
+            "started_at": None,
+            "completed_at": None,
+            "processing_time_seconds": None
+        }
+    analysis_record["analysis_type"] = ", ".join(analysis_types)
+    analysis_record["status"] = "queued"
+    analysis_record["priority"] = priority
+    analysis_record["queued_at"] = datetime.now().isoformat()
+    analysis_record["error_message"] = None
+    save_analysis_data(analysis_record)
+    
+    _get_analysis_queue().put_nowait((priority, next(_analysis_sequence), document_id, analysis_types))
+
+async def resume_pending_analyses():
+    """
+    Re-enqueue analyses that the previous run left queued or interrupted while processing.
+    Called from main's startup once storage is initialised, since the workers look documents up there.
+    """
+    pending = [record for record in load_analysis_data() if record["status"] in ("queued", "processing")]
+    pending.sort(key=lambda x: (x.get("priority", DEFAULT_ANALYSIS_PRIORITY), x.get("queued_at") or x.get("started_at") or ""))
+    for record in pending:
+        analysis_types = [t for t in record.get("analysis_type", "").split(", ") if t]
+        if record["status"] != "queued":
+            record["status"] = "queued"
+            save_analysis_data(record)
+        priority = record.get("priority", DEFAULT_ANALYSIS_PRIORITY)
+        _get_analysis_queue().put_nowait((priority, next(_analysis_sequence), record["document_id"], analysis_types))
+    if pending:
+        logger.info(f"Re-queued {len(pending)} pending analyses")
+
+@router.on_event("shutdown")
+async def stop_analysis_workers():
+    """Cancel the analysis workers (queued analyses stay recorded as "queued" and resume on startup)"""
+    for task in _analysis_workers:
+        task.cancel()
+    _analysis_workers.clear()
 
 @router.get("/routes")
 async def get_available_routes():
     """Get information about all available document analysis routes"""
-    # Get current MongoDB connection status from main module
-    main_mod = sys.modules.get("main")
-    current_mongodb_connected = False
-    
-    if main_mod:
-        current_mongodb_connected = getattr(main_mod, "mongodb_connected", False)
+    current_mongodb_connected = _get_storage_state().mongodb_connected
     
     routes_info = {
         "analysis_routes": [
@@ -503,21 +756,22 @@ async def get_supported_analysis_types():
     }
 
 @router.post("/analyze")
-async def analyze_document(request: AnalysisRequest, background_tasks: BackgroundTasks):
+async def analyze_document(request: AnalysisRequest):
     """Start analysis for a specific document"""
-    logger.info(f"Analysis request received for document {request.document_id}")
+    logger.info("Analysis request received for document %s", request.document_id)
 
     # Extra debug details about incoming request
-    logger.debug(f"Request body: analysis_types={request.analysis_types}, priority={request.priority}")
+    logger.debug("Request body: analysis_types=%s, priority=%s", request.analysis_types, request.priority)
     
     # Check if document exists
     document_info = await get_document_info(request.document_id)
-    logger.debug(f"get_document_info returned: {document_info is not None}")
+    logger.debug("get_document_info returned: %s", document_info is not None)
     if not document_info:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    # Add to processing queue
-    background_tasks.add_task(process_document_analysis, request.document_id, request.analysis_types)
+    # Add to processing queue (lower priority numbers are analysed first)
+    priority = request.priority if request.priority is not None else DEFAULT_ANALYSIS_PRIORITY
+    queue_document_analysis(document_info, request.analysis_types, priority)
     
     return {
         "message": "Document analysis started",
@@ -530,22 +784,19 @@ async def analyze_document(request: AnalysisRequest, background_tasks: Backgroun
 @router.get("/results/{document_id}")
 async def get_analysis_results(document_id: str):
     """Get analysis results for a specific document"""
-    logger.info(f"Getting analysis results for document {document_id}")
+    logger.info("Getting analysis results for document %s", document_id)
     
-    analysis_data = load_analysis_data()
-    
-    # Find analysis record
-    analysis_record = None
-    for record in analysis_data:
-        if record["document_id"] == document_id:
-            analysis_record = record
-            break
+    analysis_record = _get_analysis_index().get(document_id)
     
     if not analysis_record:
         raise HTTPException(status_code=404, detail="No analysis found for this document")
     
     return analysis_record
 
+def analysis_sort_key(record: Dict[str, Any]) -> str:
+    """Sort key for analysis records: completion time, falling back to start time"""
+    return record.get("completed_at") or record.get("started_at") or ""
+
 @router.get("/results")
 async def get_all_analysis_results(
     status: Optional[str] = Query(None, description="Filter by status"),
@@ -553,20 +804,19 @@ async def get_all_analysis_results(
     skip: int = Query(0, description="Number of results to skip")
 ):
     """Get all analysis results with optional filtering"""
-    logger.info(f"Getting analysis results with filters: status={status}, limit={limit}, skip={skip}")
+    logger.info("Getting analysis results with filters: status=%s, limit=%s, skip=%s", status, limit, skip)
     
-    analysis_data = load_analysis_data()
+    records = _get_analysis_index().values()
     
-    # Apply status filter
+    # Filter lazily and take the total from the maintained per-status counts
     if status:
-        analysis_data = [record for record in analysis_data if record["status"] == status]
-    
-    # Sort by completion date (newest first)
-    analysis_data.sort(key=lambda x: x.get("completed_at", x.get("started_at", "")), reverse=True)
+        records = (record for record in records if record["status"] == status)
+        total_count = _analysis_status_counts[status]
+    else:
+        total_count = len(records)
     
-    # Apply pagination
-    total_count = len(analysis_data)
-    paginated_data = analysis_data[skip:skip + limit]
+    # Only the requested page needs ordering (newest first), not the whole log
+    paginated_data = heapq.nlargest(skip + limit, records, key=analysis_sort_key)[skip:]
     
     return {
         "results": paginated_data,
@@ -581,17 +831,20 @@ async def get_analysis_status():
     
     analysis_data = load_analysis_data()
     
-    # Calculate statistics
+    # Status counts and average processing time in a single pass
     total_analyses = len(analysis_data)
-    status_counts = {}
+    status_counts = Counter()
+    total_processing_time = 0.0
+    timed_completed = 0
     
     for record in analysis_data:
         status = record["status"]
-        status_counts[status] = status_counts.get(status, 0) + 1
+        status_counts[status] += 1
+        if status == "completed" and record.get("processing_time_seconds"):
+            total_processing_time += record["processing_time_seconds"]
+            timed_completed += 1
     
-    # Calculate average processing time
-    completed_analyses = [r for r in analysis_data if r["status"] == "completed" and r.get("processing_time_seconds")]
-    avg_processing_time = sum(r["processing_time_seconds"] for r in completed_analyses) / len(completed_analyses) if completed_analyses else 0
+    avg_processing_time = total_processing_time / timed_completed if timed_completed else 0
     
     return {
         "total_analyses": total_analyses,
@@ -612,7 +865,7 @@ async def get_analysis_queue():
     queue_items = [record for record in analysis_data if record["status"] in ["queued", "processing"]]
     
     # Sort by priority and creation time
-    queue_items.sort(key=lambda x: (x.get("priority", 5), x.get("started_at", "")))
+    queue_items.sort(key=lambda x: (x.get("priority", DEFAULT_ANALYSIS_PRIORITY), x.get("queued_at") or x.get("started_at") or ""))
     
     return {
         "queue": queue_items,
@@ -622,19 +875,12 @@ async def get_analysis_queue():
 @router.delete("/results/{document_id}")
 async def delete_analysis_results(document_id: str):
     """Delete analysis results for a specific document"""
-    logger.info(f"Deleting analysis results for document {document_id}")
+    logger.info("Deleting analysis results for document %s", document_id)
     
-    analysis_data = load_analysis_data()
-    
-    # Find and remove analysis record
-    original_count = len(analysis_data)
-    analysis_data = [record for record in analysis_data if record["document_id"] != document_id]
-    
-    if len(analysis_data) == original_count:
+    # Remove the analysis record (recorded as a deletion in the log)
+    if not delete_analysis_data(document_id):
         raise HTTPException(status_code=404, detail="No analysis found for this document")
     
-    save_analysis_data(analysis_data)
-    
     return {"message": "Analysis results deleted successfully"}
 
 @router.get("/health")
@@ -0,0 +1,12 @@
+"""
+JSON helpers shared by the routers (orjson is a hard dependency, see requirements.txt)
+"""
+
+import orjson
+
+def json_dumps(data, indent: bool = False) -> bytes:
+    """Serialize to JSON bytes (optionally indented); datetimes become ISO strings, anything else unknown str()"""
+    return orjson.dumps(data, default=str, option=orjson.OPT_INDENT_2 if indent else 0)
+
+# Parse JSON bytes or str
+json_loads = orjson.loads
@@ -1,17 +1,24 @@
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Optional, Union
-import json
+from typing import List, Dict, Optional, Union, Tuple
 import os
 from datetime import datetime
 import logging
-import sys
-from pathlib import Path
+import asyncio
+from collections import Counter
+import itertools
+from routes.json_utils import json_dumps, json_loads
 
-# Add the parent directory to the path to import the knowledge graph
-sys.path.append(str(Path(__file__).parent.parent))
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# The backend directory is already on sys.path (routes are only imported from main.py)
 try:
     from analysis.graph import KnowledgeGraph
+    from analysis.store import knowledge_graph_lock, get_knowledge_graph, mark_knowledge_graph_changed
 except ImportError:
     KnowledgeGraph = None
     print("Warning: Could not import KnowledgeGraph. Training data will not be synced to knowledge graph.")
@@ -24,6 +31,55 @@ router = APIRouter()
 TRAINING_DATA_FILE = "training_data.json"
 TRAINING_QUESTIONS_DIR = "training_questions"
 
+# Answers saved since the last flush are appended to a log, so saving an answer never rewrites
+# TRAINING_DATA_FILE; the two are merged back into it on shutdown. The log holds back-to-back
+# msgpack records when msgpack is installed and JSON lines otherwise; both are read on startup.
+TRAINING_MSGPACK_LOG_FILE = "training_data.mpk"
+TRAINING_JSON_LOG_FILE = "training_data.jsonl"
+TRAINING_LOG_FILE = TRAINING_MSGPACK_LOG_FILE if msgpack is not None else TRAINING_JSON_LOG_FILE
+
+# Descriptor of TRAINING_LOG_FILE opened with O_APPEND, kept open between saves
+_training_log_fd: Optional[int] = None
+
+# All training records (snapshot followed by log), read from disk once per process
+_training_cache: List[Dict] = []
+_training_cache_loaded = False
+
+# Log files whose records are all in _training_cache (or that did not exist when it was loaded);
+# flush_training_data only removes these
+_merged_log_files = set()
+
+# Indexes over the cached records, built when they are first read and kept current by
+# _add_training_records: records by category, the latest answer per question (by category, then
+# question id), and record counts by category and by answer type
+_records_by_category: Dict[str, List[Dict]] = {}
+_answers_by_category: Dict[str, Dict[str, Dict]] = {}
+_category_counts: Counter = Counter()
+_answer_type_counts: Counter = Counter()
+
+# Serializes saves and knowledge graph syncs, which run in worker threads to keep disk I/O off
+# the event loop; a sync holds it so the records cannot grow while the graph reads them
+_training_write_lock = asyncio.Lock()
+
+# Knowledge graph syncs run KG_SYNC_DELAY_SECONDS after the first unsynced save, so a burst of
+# answers costs one sync instead of one each
+KG_SYNC_DELAY_SECONDS = 0.25
+_kg_sync_task: Optional[asyncio.Task] = None
+
+# Parsed question files keyed by category key, with the st_mtime_ns they were read at; a file is
+# only reparsed when it changes on disk
+_questions_file_cache: Dict[str, Tuple[int, Dict]] = {}
+
+# Records serialized per chunk when streaming /data
+DATA_STREAM_BATCH_SIZE = 256
+
+# Serialized /categories response; cleared whenever a question file is (re)parsed or disappears
+_categories_response: Optional[bytes] = None
+
+# Serialized /questions/{category} responses keyed by category, then by all_questions; a category's
+# entry is dropped when answers for it are saved
+_questions_response_cache: Dict[str, Dict[bool, bytes]] = {}
+
 class TrainingAnswer(BaseModel):
     question_id: str
     question: str
@@ -36,6 +92,17 @@ class TrainingSession(BaseModel):
     category: str
     answers: List[TrainingAnswer]
 
+def answer_to_record(answer: TrainingAnswer) -> Dict:
+    """Build the stored training record for a validated answer from its fields directly"""
+    return {
+        "question_id": answer.question_id,
+        "question": answer.question,
+        "answer": answer.answer,
+        "answer_type": answer.answer_type,
+        "category": answer.category,
+        "timestamp": answer.timestamp.isoformat()
+    }
+
 # Category mappings
 CATEGORY_MAPPINGS = {
     "Questions about my knowledge": "knowledge",
@@ -48,22 +115,52 @@ CATEGORY_MAPPINGS = {
 }
 
 def load_training_questions_from_file(category_key: str) -> Dict:
-    """Load training questions from JSON file"""
+    """Load training questions from JSON file (reparsed only when it changes; callers must not modify the result)"""
+    global _categories_response
     filename = f"{TRAINING_QUESTIONS_DIR}/{category_key}_questions.json"
     
-    if not os.path.exists(filename):
+    try:
+        mtime = os.stat(filename).st_mtime_ns
+    except OSError:
         logger.error(f"Training questions file not found: {filename}")
+        if _questions_file_cache.pop(category_key, None) is not None:
+            _categories_response = None
         return {}
     
+    cached = _questions_file_cache.get(category_key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    
     try:
-        with open(filename, 'r') as f:
-            data = json.load(f)
+        with open(filename, 'rb') as f:
+            data = json_loads(f.read())
         
+        _questions_file_cache[category_key] = (mtime, data)
+        _categories_response = None
+        if cached is not None:
+            # Edited on disk: responses built from the old questions are stale
+            for category, key in CATEGORY_MAPPINGS.items():
+                if key == category_key:
+                    _questions_response_cache.pop(category, None)
         return data
     except Exception as e:
         logger.error(f"Error loading training questions from {filename}: {e}")
         return {}
 
+def invalidate_questions_cache():
+    """Forget parsed question files so the next request rereads them"""
+    global _categories_response
+    _questions_file_cache.clear()
+    _categories_response = None
+    _questions_response_cache.clear()
+
+@router.on_event("startup")
+async def prewarm_training_caches():
+    """Parse every category's question file and the training data once before the first request"""
+    for category_key in CATEGORY_MAPPINGS.values():
+        await asyncio.to_thread(load_training_questions_from_file, category_key)
+    await asyncio.to_thread(load_training_data)
+
 def get_category_questions(category: str) -> List[Dict]:
     """Get questions for a specific category"""
     category_key = CATEGORY_MAPPINGS.get(category)
@@ -97,77 +194,177 @@ def get_available_categories() -> List[str]:
     """Get list of available training categories"""
     return list(CATEGORY_MAPPINGS.keys())
 
-def load_training_data():
-    """Load existing training data from JSON file"""
+def _read_training_files() -> List[Dict]:
+    """
+    Read the training data snapshot plus any records appended to the log since it was written.
+    Log files that are absent or were read in full are recorded in _merged_log_files.
+    """
+    records = []
+    _merged_log_files.clear()
     if os.path.exists(TRAINING_DATA_FILE):
         try:
-            with open(TRAINING_DATA_FILE, 'r') as f:
-                return json.load(f)
+            with open(TRAINING_DATA_FILE, 'rb') as f:
+                records = json_loads(f.read())
         except Exception as e:
             logger.error(f"Error loading training data: {e}")
-            return []
-    return []
+    if os.path.exists(TRAINING_JSON_LOG_FILE):
+        try:
+            log_records = []
+            with open(TRAINING_JSON_LOG_FILE, 'rb') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        log_records.append(json_loads(line))
+                    except ValueError:
+                        # A torn final line from an interrupted append
+                        logger.warning("Skipping unreadable line in training log")
+            records.extend(log_records)
+            _merged_log_files.add(TRAINING_JSON_LOG_FILE)
+        except Exception as e:
+            logger.error(f"Error loading training log: {e}")
+    else:
+        _merged_log_files.add(TRAINING_JSON_LOG_FILE)
+    if os.path.exists(TRAINING_MSGPACK_LOG_FILE):
+        if msgpack is None:
+            logger.error(f"msgpack is not installed; cannot read {TRAINING_MSGPACK_LOG_FILE}")
+        else:
+            try:
+                with open(TRAINING_MSGPACK_LOG_FILE, 'rb') as f:
+                    # A torn final record from an interrupted append simply ends the stream
+                    records.extend(list(msgpack.Unpacker(f, raw=False)))
+                _merged_log_files.add(TRAINING_MSGPACK_LOG_FILE)
+            except Exception as e:
+                logger.error(f"Error loading training log: {e}")
+    else:
+        _merged_log_files.add(TRAINING_MSGPACK_LOG_FILE)
+    return records
+
+def _encode_log_record(record: Dict) -> bytes:
+    """Serialize one record in the format of TRAINING_LOG_FILE"""
+    if msgpack is not None:
+        return msgpack.packb(record, default=str)
+    return json_dumps(record) + b"\n"
+
+def load_training_data() -> List[Dict]:
+    """Return all training records, reading them from disk on first use (callers must not modify the list)"""
+    global _training_cache_loaded
+    if not _training_cache_loaded:
+        _training_cache[:] = _read_training_files()
+        _training_cache_loaded = True
+        _index_records(_training_cache)
+    return _training_cache
+
+def _index_records(records: List[Dict]):
+    """Add records to the category, answer and count indexes; later answers replace earlier ones"""
+    for item in records:
+        category = item.get("category")
+        _records_by_category.setdefault(category, []).append(item)
+        question_id = item.get("question_id")
+        if question_id:
+            _answers_by_category.setdefault(category, {})[question_id] = {
+                "answer": item.get("answer"),
+                "answer_type": item.get("answer_type"),
+                "timestamp": item.get("timestamp")
+            }
+    _category_counts.update(item.get("category", "Unknown") for item in records)
+    _answer_type_counts.update(item.get("answer_type", "Unknown") for item in records)
+
+def _close_training_log():
+    """Close the log descriptor; the next save reopens (and if needed recreates) the file"""
+    global _training_log_fd
+    if _training_log_fd is not None:
+        os.close(_training_log_fd)
+        _training_log_fd = None
 
-def save_training_data(data: List[Dict]):
-    """Save training data to JSON file"""
+def _append_training_log(records: List[Dict]):
+    """Append new training records to the on-disk log (runs in a worker thread)"""
+    global _training_log_fd
+    load_training_data()
     try:
-        with open(TRAINING_DATA_FILE, 'w') as f:
-            json.dump(data, f, indent=2)
-        logger.info(f"Saved {len(data)} training records")
+        if _training_log_fd is None:
+            _training_log_fd = os.open(TRAINING_LOG_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        # One write(2) per save; the loop only matters if the kernel accepts a partial write
+        data = memoryview(b"".join(map(_encode_log_record, records)))
+        while data:
+            data = data[os.write(_training_log_fd, data):]
     except Exception as e:
         logger.error(f"Error saving training data: {e}")
         raise
 
-def sync_knowledge_graph():
-    """Sync training data with knowledge graph"""
+def _add_training_records(records: List[Dict]):
+    """Add saved records to the cache and indexes and drop the affected cached responses"""
+    _training_cache.extend(records)
+    _index_records(records)
+    for record in records:
+        _questions_response_cache.pop(record.get("category"), None)
+
+async def save_training_data(records: List[Dict]):
+    """Append new training records to the on-disk log, then to the in-memory cache"""
+    async with _training_write_lock:
+        await asyncio.to_thread(_append_training_log, records)
+        # Done on the event loop, not in the worker thread, so no request handler can read
+        # half-updated indexes and cache a response built from them
+        _add_training_records(records)
+    logger.info(f"Saved {len(records)} training records")
+
+def flush_training_data():
+    """Rewrite the training data snapshot with every record and empty the log"""
+    if not _training_cache_loaded:
+        return
+    try:
+        tmp_path = TRAINING_DATA_FILE + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(json_dumps(_training_cache, indent=True))
+        os.replace(tmp_path, TRAINING_DATA_FILE)
+        _close_training_log()
+        # A log that could not be read (e.g. a msgpack log while msgpack is missing) is kept,
+        # since its records are not in the snapshot
+        for log_file in _merged_log_files:
+            if os.path.exists(log_file):
+                os.remove(log_file)
+        logger.info(f"Flushed {len(_training_cache)} training records to {TRAINING_DATA_FILE}")
+    except Exception as e:
+        logger.error(f"Error flushing training data: {e}")
+
+@router.on_event("shutdown")
+async def flush_training_data_on_shutdown():
+    """Sync any pending answers into the knowledge graph and merge the log into the training data snapshot"""
+    if _kg_sync_task is not None and not _kg_sync_task.done():
+        await _kg_sync_task
+    async with _training_write_lock:
+        await asyncio.to_thread(flush_training_data)
+
+async def sync_knowledge_graph():
+    """Sync training data into the shared knowledge graph (written back by its delayed flush)"""
     if KnowledgeGraph is None:
         logger.warning("KnowledgeGraph not available, skipping sync")
         return
     
-    try:
-        kg = KnowledgeGraph()
-        
-        # Try to load existing graph
+    async with _training_write_lock, knowledge_graph_lock:
         try:
-            kg.load("knowledge_graph.pkl")
+            kg = await get_knowledge_graph()
+            # Only new records are added; an unchanged graph is not marked for a write-back
+            if await asyncio.to_thread(kg.sync_with_training_records, load_training_data()):
+                mark_knowledge_graph_changed()
+                logger.info("Successfully synchronized training data with knowledge graph")
         except Exception as e:
-            logger.info(f"No existing graph found, creating new one: {e}")
-            # Create example data
-            kg.add_entry("Knowledge", "What is your expertise?", "AI, coding, philosophy")
-            kg.add_entry("Feelings", "How do you feel today?", "Curious and motivated")
-            kg.add_entry("Personalities", "Which of the Big Five fits you best?", "Openness to experience")
-            kg.add_entry("ImportanceOfPeople", "Who is most important in your life?", "Family and close friends")
-            kg.add_entry("Preferences", "What is your favorite hobby?", "Reading science fiction")
-            kg.add_entry("Morals", "Is honesty always the best policy?", "Usually, but context matters")
-            kg.add_entry("AutomaticQuestions", "What would you like to learn next?", "Graph databases")
-        
-        # Sync with training data
-        kg.sync_with_training_data(TRAINING_DATA_FILE)
-        
-        # Save the updated graph
-        kg.save("knowledge_graph.pkl")
-        
-        logger.info("Successfully synchronized training data with knowledge graph")
-        
-    except Exception as e:
-        logger.error(f"Error syncing knowledge graph: {e}")
+            logger.error(f"Error syncing knowledge graph: {e}")
+
+def schedule_knowledge_graph_sync():
+    """Schedule a knowledge graph sync unless one is already pending"""
+    global _kg_sync_task
+    if _kg_sync_task is None or _kg_sync_task.done():
+        _kg_sync_task = asyncio.create_task(_sync_knowledge_graph_later())
+
+async def _sync_knowledge_graph_later():
+    await asyncio.sleep(KG_SYNC_DELAY_SECONDS)
+    await sync_knowledge_graph()
 
 def get_existing_answers_for_category(category: str) -> Dict[str, Dict]:
-    """Get existing answers for a specific category"""
-    training_data = load_training_data()
-    existing_answers = {}
-    
-    for item in training_data:
-        if item.get("category") == category:
-            question_id = item.get("question_id")
-            if question_id:
-                existing_answers[question_id] = {
-                    "answer": item.get("answer"),
-                    "answer_type": item.get("answer_type"),
-                    "timestamp": item.get("timestamp")
-                }
-    
-    return existing_answers
+    """Get existing answers for a specific category (callers must not modify the result)"""
+    load_training_data()
+    return _answers_by_category.get(category, {})
 
 def enhance_questions_with_answers(questions: List[Dict], existing_answers: Dict[str, Dict]) -> List[Dict]:
     """Add existing answer information to questions"""
@@ -198,6 +395,13 @@ async def get_training_questions(category: str, all_questions: bool = True):
     if category not in CATEGORY_MAPPINGS:
         raise HTTPException(status_code=404, detail=f"Category '{category}' not found")
     
+    # Unchanged since the last request for this category: reuse the serialized response
+    # (checking the question file first drops the cached response if the file was edited)
+    load_training_questions_from_file(CATEGORY_MAPPINGS[category])
+    cached = _questions_response_cache.get(category, {}).get(all_questions)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+    
     if all_questions:
         questions = get_all_category_questions(category)
     else:
@@ -214,19 +418,28 @@ async def get_training_questions(category: str, all_questions: bool = True):
     
     logger.info(f"Returning {len(enhanced_questions)} questions for category: {category} ({answered_count} answered)")
     
-    return {
+    payload = json_dumps({
         "category": category,
         "questions": enhanced_questions,
         "total_questions": len(enhanced_questions),
         "answered_questions": answered_count,
         "progress_percentage": (answered_count / len(enhanced_questions)) * 100 if enhanced_questions else 0
-    }
+    })
+    _questions_response_cache.setdefault(category, {})[all_questions] = payload
+    return Response(content=payload, media_type="application/json")
 
 @router.get("/categories")
 async def get_training_categories():
     """Get all available training categories"""
+    global _categories_response
     logger.info("Getting all training categories")
     
+    # Revalidate the question files; reparsing any of them clears the cached response
+    for category_key in CATEGORY_MAPPINGS.values():
+        load_training_questions_from_file(category_key)
+    if _categories_response is not None:
+        return Response(content=_categories_response, media_type="application/json")
+    
     categories = get_available_categories()
     
     # Get question counts for each category
@@ -247,37 +460,21 @@ async def get_training_categories():
             "total_questions": total_count
         })
     
-    return {
+    _categories_response = json_dumps({
         "categories": category_info,
         "total_categories": len(categories)
-    }
+    })
+    return Response(content=_categories_response, media_type="application/json")
 
 @router.post("/answer")
 async def save_training_answer(answer: TrainingAnswer):
     """Save a training answer"""
     logger.info(f"Saving answer for question {answer.question_id}")
     
-    # Load existing data
-    training_data = load_training_data()
-    
-    # Convert answer to dictionary
-    answer_dict = {
-        "question_id": answer.question_id,
-        "question": answer.question,
-        "answer": answer.answer,
-        "answer_type": answer.answer_type,
-        "category": answer.category,
-        "timestamp": answer.timestamp.isoformat()
-    }
-    
-    # Add to training data
-    training_data.append(answer_dict)
+    await save_training_data([answer_to_record(answer)])
     
-    # Save back to file
-    save_training_data(training_data)
-    
-    # Sync with knowledge graph
-    sync_knowledge_graph()
+    # Sync with knowledge graph shortly, together with any answers saved meanwhile
+    schedule_knowledge_graph_sync()
     
     logger.info(f"Successfully saved answer for question {answer.question_id}")
     
@@ -288,26 +485,10 @@ async def save_training_session(session: TrainingSession):
     """Save a complete training session"""
     logger.info(f"Saving training session for category: {session.category}")
     
-    # Load existing data
-    training_data = load_training_data()
-    
-    # Convert session answers to dictionaries
-    for answer in session.answers:
-        answer_dict = {
-            "question_id": answer.question_id,
-            "question": answer.question,
-            "answer": answer.answer,
-            "answer_type": answer.answer_type,
-            "category": answer.category,
-            "timestamp": answer.timestamp.isoformat()
-        }
-        training_data.append(answer_dict)
+    await save_training_data([answer_to_record(answer) for answer in session.answers])
     
-    # Save back to file
-    save_training_data(training_data)
-    
-    # Sync with knowledge graph
-    sync_knowledge_graph()
+    # Sync with knowledge graph shortly, together with any answers saved meanwhile
+    schedule_knowledge_graph_sync()
     
     logger.info(f"Successfully saved training session with {len(session.answers)} answers")
     
@@ -325,48 +506,50 @@ async def get_training_data(category: Optional[str] = None):
     training_data = load_training_data()
     
     if category:
-        training_data = [item for item in training_data if item.get("category") == category]
+        training_data = _records_by_category.get(category, [])
     
     logger.info(f"Returning {len(training_data)} training records")
     
-    return {
-        "training_data": training_data,
-        "total_records": len(training_data),
-        "category_filter": category
-    }
+    return StreamingResponse(_iter_training_data_json(training_data, category), media_type="application/json")
+
+def _iter_training_data_json(records: List[Dict], category: Optional[str]):
+    """
+    Yield the /data response JSON in chunks of DATA_STREAM_BATCH_SIZE records, straight from the
+    cached list, so the full response body is never built in memory.
+    """
+    # Answers saved while streaming are appended to the same list; stop at the count reported up front
+    total = len(records)
+    rows = itertools.islice(records, total)
+    yield b'{"training_data":['
+    first = True
+    while True:
+        batch = list(itertools.islice(rows, DATA_STREAM_BATCH_SIZE))
+        if not batch:
+            break
+        chunk = b",".join(map(json_dumps, batch))
+        yield chunk if first else b"," + chunk
+        first = False
+    yield b'],"total_records":' + json_dumps(total) + b',"category_filter":' + json_dumps(category) + b'}'
 
 @router.get("/stats")
 async def get_training_stats():
     """Get statistics about training data"""
     logger.info("Getting training statistics")
     
+    # Counts by category and answer type are kept current as answers are saved
     training_data = load_training_data()
     
-    # Count by category
-    category_counts = {}
-    for item in training_data:
-        category = item.get("category", "Unknown")
-        category_counts[category] = category_counts.get(category, 0) + 1
-    
-    # Count by answer type
-    type_counts = {}
-    for item in training_data:
-        answer_type = item.get("answer_type", "Unknown")
-        type_counts[answer_type] = type_counts.get(answer_type, 0) + 1
-    
-    # Get available questions count
+    # Get available questions count (question files are cached, so this only stats them)
     available_questions = {}
-    for category in get_available_categories():
-        category_key = CATEGORY_MAPPINGS[category]
+    for category, category_key in CATEGORY_MAPPINGS.items():
         category_data = load_training_questions_from_file(category_key)
-        total_available = len(category_data.get("predefined_questions", [])) + len(category_data.get("additional_questions", []))
-        available_questions[category] = total_available
+        available_questions[category] = len(category_data.get("predefined_questions", ())) + len(category_data.get("additional_questions", ()))
     
     stats = {
         "total_answers": len(training_data),
-        "categories": category_counts,
-        "answer_types": type_counts,
-        "available_categories": get_available_categories(),
+        "categories": dict(_category_counts),
+        "answer_types": dict(_answer_type_counts),
+        "available_categories": list(available_questions),
         "available_questions_per_category": available_questions
     }
     
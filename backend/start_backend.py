@@ -4,6 +4,8 @@ Model Myself Backend Starter
 This script automatically starts MongoDB and then runs the backend server
 """
 
+import json
+import socket
 import subprocess
 import sys
 import time
@@ -11,8 +13,19 @@ import os
 import platform
 from pathlib import Path
 
-def run_command(command, shell=True):
-    """Run a command and return success status"""
+# Resolved once at import: the backend directory is this script's own directory, not the CWD
+BACKEND_DIR = Path(__file__).resolve().parent
+IS_MACOS = platform.system() == "Darwin"
+
+# Name of the Homebrew MongoDB service
+MONGODB_SERVICE = "mongodb-community"
+
+# Address MongoDB listens on (matches MONGODB_URL in main.py)
+MONGODB_HOST = "127.0.0.1"
+MONGODB_PORT = 27017
+
+def run_command(command, shell=False):
+    """Run a command (an argument list unless shell=True) and return success status"""
     try:
         result = subprocess.run(command, shell=shell, capture_output=True, text=True)
         return result.returncode == 0, result.stdout, result.stderr
@@ -21,10 +34,30 @@ def run_command(command, shell=True):
 
 def is_mongodb_running():
     """Check if MongoDB is running"""
-    success, stdout, stderr = run_command("brew services list | grep mongodb-community")
-    if success:
-        return "started" in stdout
-    return False
+    success, stdout, stderr = run_command(["brew", "services", "list", "--json"])
+    try:
+        services = json.loads(stdout) if success else []
+    except ValueError:
+        services = []
+    return any(
+        service.get("name") == MONGODB_SERVICE and service.get("status") == "started"
+        for service in services
+    )
+
+def wait_for_mongo(timeout=10):
+    """Poll the MongoDB port with exponential backoff (10ms up to 500ms); True once it accepts connections"""
+    deadline = time.monotonic() + timeout
+    delay = 0.01
+    while True:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.settimeout(0.1)
+            if sock.connect_ex((MONGODB_HOST, MONGODB_PORT)) == 0:
+                return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, 0.5)
 
 def start_mongodb():
     """Start MongoDB service"""
@@ -35,21 +68,18 @@ def start_mongodb():
         return True
     
     # Try to start MongoDB
-    success, stdout, stderr = run_command("sudo brew services start mongodb-community")
+    success, stdout, stderr = run_command(["sudo", "brew", "services", "start", MONGODB_SERVICE])
     
     if success:
         print("✅ MongoDB started successfully")
         print("⏳ Waiting for MongoDB to initialize...")
-        time.sleep(5)
         
-        # Verify MongoDB is running
-        if is_mongodb_running():
+        # Verify MongoDB is accepting connections
+        if wait_for_mongo():
             print("✅ MongoDB is running and ready")
             return True
-        else:
-            print("⚠️  MongoDB started but not yet ready, waiting...")
-            time.sleep(5)
-            return is_mongodb_running()
+        print("⚠️  MongoDB started but is not accepting connections yet")
+        return False
     else:
         print(f"❌ Failed to start MongoDB: {stderr}")
         return False
@@ -68,11 +98,6 @@ def check_dependencies():
         print("💡 Run: pip install -r requirements.txt")
         return False
     
-    # Check if we're in the right directory
-    if not Path("main.py").exists():
-        print("❌ main.py not found. Make sure you're in the backend directory")
-        return False
-    
     print("✅ All dependencies check passed")
     return True
 
@@ -84,8 +109,10 @@ def start_backend():
     os.environ["MONGODB_STARTUP"] = "auto"
     
     try:
-        # Import and run the main application
+        # Import the application and server only now that the pre-flight checks are done,
+        # so a failed check never pays for loading FastAPI, Motor and the routers
         import main
+        import uvicorn
         
         print("✅ Backend imports successful")
         print("🌐 Starting server on http://localhost:8089")
@@ -95,15 +122,14 @@ def start_backend():
         print("=" * 50)
         
         # Run the server
-        if __name__ == "__main__":
-            import uvicorn
-            uvicorn.run(
-                "main:app",
-                host="0.0.0.0",
-                port=8089,
-                reload=True,
-                log_level="info"
-            )
+        uvicorn.run(
+            "main:app",
+            host="0.0.0.0",
+            port=8089,
+            reload=True,
+            log_level="info",
+            **main.SERVER_OPTIONS
+        )
             
     except KeyboardInterrupt:
         print("\n🛑 Server stopped by user")
@@ -117,17 +143,21 @@ def main():
     print("🚀 Model Myself Backend Startup")
     print("=" * 40)
     
+    # main.py and its data files are resolved relative to the backend directory (as in run_backend.sh)
+    os.chdir(BACKEND_DIR)
+    
     # Check if we're on macOS (required for brew services)
-    if platform.system() != "Darwin":
+    if not IS_MACOS:
         print("⚠️  This script is designed for macOS with Homebrew")
         print("💡 You may need to start MongoDB manually on other systems")
     
-    # Check dependencies
+    # Check dependencies first, so MongoDB (and its sudo prompt) is only started once they pass
     if not check_dependencies():
         sys.exit(1)
     
-    # Start MongoDB
-    if not start_mongodb():
+    mongodb_ok = start_mongodb()
+    
+    if not mongodb_ok:
         print("⚠️  MongoDB failed to start, continuing with local storage fallback")
         print("💡 The backend will still work but use local file storage")
     
@@ -0,0 +1,107 @@
+"""
+Questions for the automatic category
+"""
+
+try:
+    from ._records import build_additional_questions
+except ImportError:
+    # Run as a script from this directory rather than imported as part of a package
+    from _records import build_additional_questions
+
+def create_automatic_questions():
+    """Create questions for automatic category"""
+    
+    base_questions = [
+        {"id": "auto_1", "question": "What topics would you like to be asked about regularly?", "type": "text"},
+        {"id": "auto_2", "question": "How often would you like to receive knowledge-building questions?", "type": "multiple_choice", "options": ["Daily", "Weekly", "Bi-weekly", "Monthly", "When I request them"]},
+        {"id": "auto_3", "question": "What format works best for you to reflect on knowledge?", "type": "multiple_choice", "options": ["Short questions", "Deep reflections", "Comparisons", "Hypothetical scenarios", "Mixed formats"]},
+        {"id": "auto_4", "question": "Which areas of your knowledge need the most development?", "type": "text"},
+        {"id": "auto_5", "question": "How do you prefer to track your learning progress?", "type": "multiple_choice", "options": ["Written journal", "Digital notes", "Progress charts", "Discussion with others", "Mental reflection"]}
+    ]
+    
+    # Text questions about automatic learning
+    text_questions = [
+        "What patterns do you notice in your learning habits?",
+        "How do you identify knowledge gaps in your life?",
+        "What triggers your curiosity about new topics?",
+        "How do you want to be reminded about learning goals?",
+        "What subjects do you wish you explored more automatically?",
+        "How do you prefer to receive learning challenges?",
+        "What role should AI play in your learning journey?",
+        "How do you want to track your intellectual growth?",
+        "What automated systems would help your learning?",
+        "How do you prefer to discover new areas of interest?",
+        "What questions do you wish you asked yourself more often?",
+        "How do you want to be challenged intellectually?",
+        "What learning reminders would be most helpful?",
+        "How do you prefer to review and consolidate knowledge?",
+        "What automated feedback would improve your learning?",
+        "How do you want to connect different areas of knowledge?",
+        "What learning patterns would you like to develop?",
+        "How do you prefer to be prompted for reflection?",
+        "What automated suggestions would enhance your growth?",
+        "How do you want to measure your learning effectiveness?",
+        "What personalized learning experiences do you desire?",
+        "How do you prefer to be guided in knowledge exploration?",
+        "What automated tools would support your learning goals?",
+        "How do you want to be encouraged in your learning journey?",
+        "What learning analytics would be most valuable to you?",
+        "How do you prefer to receive adaptive learning content?",
+        "What automated insights would improve your self-understanding?",
+        "How do you want to be supported in developing new skills?",
+        "What learning automation would save you the most time?",
+        "How do you prefer to be reminded of your learning objectives?",
+        "What automated connections would enhance your knowledge?",
+        "How do you want to be challenged based on your progress?",
+        "What learning personalization would be most beneficial?",
+        "How do you prefer to receive context-aware learning prompts?",
+        "What automated evaluation would help track your growth?",
+        "How do you want to be guided through complex topics?",
+        "What learning automation would keep you most engaged?",
+        "How do you prefer to discover connections between concepts?",
+        "What automated support would improve your retention?",
+        "How do you want to be assisted in applying knowledge?",
+        "What learning automation would boost your confidence?",
+        "How do you prefer to receive personalized learning paths?",
+        "What automated insights would enhance your decision-making?",
+        "How do you want to be guided in critical thinking?",
+        "What learning automation would improve your problem-solving?",
+        "How do you prefer to be supported in creative thinking?",
+        "What automated tools would enhance your communication skills?",
+        "How do you want to be assisted in emotional intelligence?",
+        "What learning automation would improve your leadership?",
+        "How do you prefer to be guided in personal development?"
+    ]
+    
+    # Multiple choice questions
+    mc_questions = [
+        {"question": "Your preferred learning reminder frequency is:", "options": ["Multiple times daily", "Once daily", "Few times weekly", "Weekly", "As needed"]},
+        {"question": "For automated learning, you prefer:", "options": ["Structured curriculum", "Adaptive content", "Random challenges", "Goal-oriented", "Mixed approaches"]},
+        {"question": "Your ideal learning prompt timing is:", "options": ["Morning reflection", "Throughout the day", "Evening review", "Weekend deep dives", "Flexible timing"]},
+        {"question": "For knowledge tracking, you prefer:", "options": ["Visual progress", "Detailed analytics", "Simple checkmarks", "Narrative summaries", "No tracking"]},
+        {"question": "Your automated learning style preference is:", "options": ["Question-based", "Scenario-based", "Comparison-based", "Story-based", "Mixed formats"]},
+        {"question": "For learning recommendations, you prefer:", "options": ["AI-generated", "Peer-suggested", "Expert-curated", "Self-directed", "Combined sources"]},
+        {"question": "Your preferred challenge level is:", "options": ["Slightly difficult", "Moderately challenging", "Highly challenging", "Adaptive difficulty", "Varies by topic"]},
+        {"question": "For learning content, you prefer:", "options": ["Bite-sized pieces", "Comprehensive modules", "Interactive exercises", "Multimedia content", "Text-based"]},
+        {"question": "Your automated feedback preference is:", "options": ["Immediate feedback", "Delayed reflection", "Peer feedback", "Self-assessment", "Mixed feedback"]},
+        {"question": "For learning motivation, you prefer:", "options": ["Achievement badges", "Progress tracking", "Social recognition", "Personal satisfaction", "External rewards"]},
+        {"question": "Your ideal learning environment is:", "options": ["Quiet spaces", "Background stimulation", "Social settings", "Outdoor locations", "Varies by topic"]},
+        {"question": "For knowledge application, you prefer:", "options": ["Practical exercises", "Theoretical analysis", "Real-world projects", "Simulated scenarios", "Discussion-based"]},
+        {"question": "Your learning schedule preference is:", "options": ["Fixed schedule", "Flexible timing", "Deadline-driven", "Mood-based", "Opportunity-based"]},
+        {"question": "For learning support, you prefer:", "options": ["Automated guidance", "Human mentorship", "Peer learning", "Self-directed", "Hybrid approach"]},
+        {"question": "Your knowledge retention method is:", "options": ["Spaced repetition", "Active recall", "Note-taking", "Teaching others", "Practical application"]}
+    ]
+    
+    # Text and multiple choice questions, padded with generic ones to reach 250
+    additional_questions = build_additional_questions(
+        "auto", len(base_questions) + 1, text_questions, mc_questions,
+        "Additional automatic learning question {}: How would you like to be supported in this area?"
+    )
+    
+    return {
+        "category": "Automatic questions to extend known knowledge",
+        "category_key": "automatic",
+        "existing_answers": [],
+        "predefined_questions": base_questions,
+        "additional_questions": additional_questions
+    }
@@ -0,0 +1,107 @@
+"""
+Questions for the people category
+"""
+
+try:
+    from ._records import build_additional_questions
+except ImportError:
+    # Run as a script from this directory rather than imported as part of a package
+    from _records import build_additional_questions
+
+def create_people_questions():
+    """Create questions for people category"""
+    
+    base_questions = [
+        {"id": "people_1", "question": "Who are the most important people in your life and why?", "type": "text"},
+        {"id": "people_2", "question": "How do you typically maintain relationships?", "type": "multiple_choice", "options": ["Regular contact", "Quality time together", "Helping when needed", "Sharing experiences", "Being a good listener"]},
+        {"id": "people_3", "question": "What qualities do you value most in others?", "type": "text"},
+        {"id": "people_4", "question": "How do you handle conflicts with important people?", "type": "multiple_choice", "options": ["Address directly", "Give it time", "Seek mediation", "Avoid confrontation", "Compromise"]},
+        {"id": "people_5", "question": "What role do you play in your social circles?", "type": "multiple_choice", "options": ["The organizer", "The supporter", "The advisor", "The entertainer", "The peacemaker"]}
+    ]
+    
+    # Text questions about relationships
+    text_questions = [
+        "How do you build trust with new people?",
+        "What makes a relationship meaningful to you?",
+        "How do you show appreciation to important people?",
+        "What role does communication play in your relationships?",
+        "How do you handle disagreements with loved ones?",
+        "What qualities do you bring to friendships?",
+        "How do you maintain long-distance relationships?",
+        "What does loyalty mean to you in relationships?",
+        "How do you support others during difficult times?",
+        "What boundaries do you set in relationships?",
+        "How do you handle jealousy in relationships?",
+        "What role does family play in your life?",
+        "How do you make new friends as an adult?",
+        "What does forgiveness mean to you?",
+        "How do you handle toxic relationships?",
+        "What role does vulnerability play in your connections?",
+        "How do you balance independence with relationships?",
+        "What makes you feel understood by others?",
+        "How do you handle criticism from people you care about?",
+        "What role does humor play in your relationships?",
+        "How do you show empathy to others?",
+        "What does emotional intimacy mean to you?",
+        "How do you handle when others disappoint you?",
+        "What role does shared interests play in friendships?",
+        "How do you navigate different personality types?",
+        "What makes you feel supported by others?",
+        "How do you handle peer pressure?",
+        "What role does honesty play in your relationships?",
+        "How do you maintain relationships during busy periods?",
+        "What does unconditional love mean to you?",
+        "How do you handle when friends grow apart?",
+        "What role does physical affection play in your relationships?",
+        "How do you navigate cultural differences in relationships?",
+        "What makes you feel valued by others?",
+        "How do you handle competitive dynamics with friends?",
+        "What role does shared values play in relationships?",
+        "How do you support others' personal growth?",
+        "What does respect mean to you in relationships?",
+        "How do you handle when others need space?",
+        "What role does tradition play in your family relationships?",
+        "How do you navigate power dynamics in relationships?",
+        "What makes you feel comfortable opening up to others?",
+        "How do you handle when others judge your choices?",
+        "What role does gratitude play in your relationships?",
+        "How do you maintain authenticity in social situations?",
+        "What does commitment mean to you in relationships?",
+        "How do you handle when others betray your trust?",
+        "What role does mutual respect play in your connections?",
+        "How do you balance giving and receiving in relationships?",
+        "What makes you feel emotionally safe with others?"
+    ]
+    
+    # Multiple choice questions
+    mc_questions = [
+        {"question": "In group settings, you prefer:", "options": ["Leading discussions", "Contributing ideas", "Listening actively", "Mediating conflicts", "Organizing activities"]},
+        {"question": "Your approach to making friends is:", "options": ["Outgoing and social", "Gradual and careful", "Through shared activities", "Online connections", "Depends on situation"]},
+        {"question": "When someone is upset, you typically:", "options": ["Offer practical help", "Provide emotional support", "Give them space", "Try to cheer them up", "Listen without judgment"]},
+        {"question": "Your ideal social circle size is:", "options": ["Large and diverse", "Medium sized", "Small and intimate", "Just a few close friends", "Varies by life stage"]},
+        {"question": "In romantic relationships, you value most:", "options": ["Emotional connection", "Physical attraction", "Shared values", "Intellectual compatibility", "All equally important"]},
+        {"question": "Your communication style with family is:", "options": ["Open and direct", "Respectful and formal", "Casual and relaxed", "Depends on family member", "Minimal communication"]},
+        {"question": "When meeting new people, you:", "options": ["Introduce yourself readily", "Wait for introductions", "Observe before engaging", "Focus on common interests", "Depends on the setting"]},
+        {"question": "Your approach to social media connections is:", "options": ["Connect with everyone", "Only close friends", "Professional network", "Minimal social media", "Depends on platform"]},
+        {"question": "In friendships, you prefer:", "options": ["Deep conversations", "Shared activities", "Mutual support", "Fun and laughter", "Intellectual discussions"]},
+        {"question": "Your conflict resolution style is:", "options": ["Direct confrontation", "Diplomatic discussion", "Seek mediation", "Avoid conflict", "Depends on relationship"]},
+        {"question": "When others succeed, you typically feel:", "options": ["Genuinely happy", "Slightly envious", "Motivated to improve", "Depends on the person", "Indifferent"]},
+        {"question": "Your approach to networking is:", "options": ["Strategic and purposeful", "Natural and organic", "Avoid networking", "Online focused", "Event-based"]},
+        {"question": "In team dynamics, you usually:", "options": ["Take charge", "Contribute expertise", "Support harmony", "Challenge ideas", "Depends on team"]},
+        {"question": "Your boundary setting is:", "options": ["Clear and firm", "Flexible and adaptable", "Struggle with boundaries", "Depends on relationship", "Avoid setting boundaries"]},
+        {"question": "When others need advice, you:", "options": ["Give direct recommendations", "Ask guiding questions", "Share similar experiences", "Listen without advising", "Depends on the situation"]}
+    ]
+    
+    # Text and multiple choice questions, padded with generic ones to reach 250
+    additional_questions = build_additional_questions(
+        "people", len(base_questions) + 1, text_questions, mc_questions,
+        "Additional relationship question {}: How do you approach this aspect of your relationships?"
+    )
+    
+    return {
+        "category": "Question about the importance of people in my life",
+        "category_key": "people",
+        "existing_answers": [],
+        "predefined_questions": base_questions,
+        "additional_questions": additional_questions
+    }
@@ -0,0 +1,32 @@
+"""
+Shared record construction for the generated training question categories
+"""
+
+import itertools
+
+# Every category has this many additional questions; the list is padded with generic ones
+ADDITIONAL_QUESTION_COUNT = 250
+TEXT_PLACEHOLDER = "Share your thoughts..."
+
+# Record templates: copying one keeps the key order and only the id/question (and options) change
+_TEXT_SKELETON = {"id": "", "question": "", "type": "text", "placeholder": TEXT_PLACEHOLDER}
+_MC_SKELETON = {"id": "", "question": "", "type": "multiple_choice", "options": None}
+
+def build_additional_questions(id_prefix, first_number, text_questions, mc_questions, filler_template):
+    """
+    Build the additional question records in one pass: text questions, then multiple choice,
+    then filler text questions (filler_template formatted with 1, 2, ...) up to
+    ADDITIONAL_QUESTION_COUNT, numbered consecutively from first_number.
+    """
+    filler_count = ADDITIONAL_QUESTION_COUNT - len(text_questions) - len(mc_questions)
+    entries = itertools.chain(
+        ((q, None) for q in text_questions),
+        ((q["question"], q["options"]) for q in mc_questions),
+        ((filler_template.format(i + 1), None) for i in range(filler_count))
+    )
+    return [
+        {**_TEXT_SKELETON, "id": f"{id_prefix}_{number}", "question": question}
+        if options is None else
+        {**_MC_SKELETON, "id": f"{id_prefix}_{number}", "question": question, "options": options}
+        for number, (question, options) in enumerate(entries, start=first_number)
+    ]
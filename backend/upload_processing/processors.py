@@ -373,6 +373,10 @@ class MetadataExtractor(BaseProcessor):
 class KnowledgeGraphExtractor(BaseProcessor):
     """Extract knowledge graph entries (category, question, answer) from text using an LLM"""
 
+    # Anthropic clients shared across instances, keyed by API key, so concurrent
+    # analyses reuse one pooled keep-alive HTTP connection set
+    _clients: Dict[str, "anthropic.Anthropic"] = {}
+
     def __init__(self, config: Optional[Dict[str, Any]] = None):
         super().__init__(config)
         # Maximum tokens in prompt to avoid overrun
@@ -380,6 +384,14 @@ class KnowledgeGraphExtractor(BaseProcessor):
         # OpenAI model name (can be overridden via env var or config)
         self.model_name = self.config.get("model", os.getenv("ANTHROPIC_MODEL", "claude-3-haiku-20240307"))
 
+    @classmethod
+    def get_client(cls, api_key: str) -> "anthropic.Anthropic":
+        """Return the shared Anthropic client for an API key, creating it on first use"""
+        client = cls._clients.get(api_key)
+        if client is None:
+            client = cls._clients[api_key] = anthropic.Anthropic(api_key=api_key)
+        return client
+
     async def process(self, content: str, document_info: Dict[str, Any]) -> Dict[str, Any]:
         """Call LLM to extract knowledge graph entries from content"""
         if not self.validate_input(content, document_info):
@@ -390,7 +402,7 @@ class KnowledgeGraphExtractor(BaseProcessor):
             if not api_key:
                 return {"error": "ANTHROPIC_API_KEY environment variable is not set"}
 
-            client = anthropic.Anthropic(api_key=api_key)
+            client = self.get_client(api_key)
 
             # Truncate content if too long for prompt
             if len(content) > self.max_prompt_chars: